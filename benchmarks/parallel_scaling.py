@@ -0,0 +1,42 @@
+"""Speed-up of the multi-threaded trend computation versus thread count.
+
+Usage: python benchmarks/parallel_scaling.py [NJ NK NL]
+"""
+import os
+import sys
+import time
+
+from globagrim import boundary_conditions, grid, init, trend
+from globagrim.constants import GLOBAL_CONST
+from globagrim.variables import ModelState
+
+
+def time_trend(repeat=10, **kwargs):
+    state = ModelState(GLOBAL_CONST(**kwargs))
+    grid.grid(state)
+    init.init_case(state)
+    boundary_conditions.boundary_conditions(state)
+    trend.trend(state)  # warm-up (thread pool, numba compilation)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        trend.trend(state)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    NJ, NK, NL = [int(n) for n in sys.argv[1:4]] or [144, 72, 20]
+    threads = [1]
+    while threads[-1] * 2 <= os.cpu_count():
+        threads.append(threads[-1] * 2)
+    print(f"grid {NJ}x{NK}x{NL}, {os.cpu_count()} cores")
+    print(f"{'backend':>8} {'threads':>8} {'ms/trend':>10} {'speed-up':>9}")
+    for backend in ["numpy", "numba"]:
+        serial = None
+        for n in threads:
+            seconds = time_trend(NJ=NJ, NK=NK, NL=NL, BACKEND=backend, NTHREADS=n)
+            serial = serial or seconds
+            print(f"{backend:>8} {n:>8} {1e3 * seconds:>10.2f} {serial / seconds:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Accuracy and stability of the float32 mode against float64.
+
+Integrates the same experiment with DTYPE="float64", DTYPE="float32"
+(float64 vertical sums) and DTYPE="float32" with ACC64=False. Prints the
+RMS and maximum deviation of the float32 output from the float64 output
+per output day, the wall time and the memory of the model arrays.
+
+Usage: python benchmarks/precision.py [--iexp N] [--tf HOURS] [--nj NJ --nk NK --nl NL --dt DT]
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import netCDF4
+import numpy as np
+
+from globagrim import model
+
+VARIABLES = ["PSG", "T", "U", "V"]
+
+
+def _array_memory(state):
+    # MiB of all 2D/3D model arrays
+    return (
+        sum(
+            value.nbytes
+            for value in vars(state.array).values()
+            if isinstance(value, np.ndarray) and value.ndim >= 2
+        )
+        / 2**20
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iexp", type=int, default=1)
+    parser.add_argument("--tf", type=float, default=72.0, help="hours")
+    parser.add_argument("--nj", type=int, default=72)
+    parser.add_argument("--nk", type=int, default=36)
+    parser.add_argument("--nl", type=int, default=10)
+    parser.add_argument("--dt", type=float, default=60.0)
+    args = parser.parse_args()
+
+    config = dict(
+        IEXP=args.iexp,
+        SEED=0,
+        NJ=args.nj,
+        NK=args.nk,
+        NL=args.nl,
+        DT=args.dt,
+        TF=args.tf,
+        INT=6,
+        VERBOSE=0,
+    )
+    modes = {
+        "float64": dict(DTYPE="float64"),
+        "float32": dict(DTYPE="float32"),
+        "float32, ACC64=False": dict(DTYPE="float32", ACC64=False),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        files = {}
+        print(f"{'mode':<22} {'wall [s]':>9} {'arrays [MiB]':>13} {'finite':>7}")
+        for name, mode in modes.items():
+            files[name] = os.path.join(directory, name.replace(" ", "") + ".nc")
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                start = time.perf_counter()
+                state = model.run(OUT=files[name], **config, **mode)
+                seconds = time.perf_counter() - start
+            finite = bool(np.isfinite(state.array.ps).all())
+            print(f"{name:<22} {seconds:>9.1f} {_array_memory(state):>13.1f} {finite!s:>7}")
+
+        with netCDF4.Dataset(files["float64"]) as ds:
+            reference = {v: ds[v][:].astype(np.float64) for v in VARIABLES}
+            hours = (ds["time"][:] - ds["time"][0]) / 3600
+        for name in list(modes)[1:]:
+            print(f"\ndeviation of {name} from float64 (RMS / max)")
+            print(f"{'hour':>6} " + " ".join(f"{v:>21}" for v in VARIABLES))
+            with netCDF4.Dataset(files[name]) as ds:
+                fields = {v: ds[v][:].astype(np.float64) for v in VARIABLES}
+            for n, hour in enumerate(hours):
+                if hour % 24 and n != len(hours) - 1:
+                    continue
+                cells = []
+                for v in VARIABLES:
+                    deviation = fields[v][n] - reference[v][n]
+                    cells.append(
+                        f"{np.sqrt(np.mean(deviation**2)):>10.3e}"
+                        f" {np.abs(deviation).max():>10.3e}"
+                    )
+                print(f"{hour:>6.0f} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
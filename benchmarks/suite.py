@@ -0,0 +1,265 @@
+"""Benchmarks of trend, boundary conditions, output and full model runs.
+
+Times trend.trend(), boundary_conditions.boundary_conditions() and
+output.fill_output() on a grid, and the complete model.run() of every
+experiment, for several resolutions and numbers of levels. Reports
+milliseconds per call, time steps per second and the memory peak
+(tracemalloc) of each benchmark. Results are stored as JSON so that the
+throughput of two versions can be compared.
+
+Usage:
+    python benchmarks/suite.py [--quick] [--steps N] [--backend B] [--layout L] [--save FILE]
+    python benchmarks/suite.py --compare OLD.json NEW.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+from globagrim import boundary_conditions, grid, init, model, output, trend
+from globagrim.constants import GLOBAL_CONST
+from globagrim.variables import ModelState
+
+RESOLUTIONS = [(72, 36), (144, 72), (288, 144)]
+LEVELS = [10, 20]
+EXPERIMENTS = [1, 2, 3]
+
+
+def _state(directory, **kwargs):
+    state = ModelState(
+        GLOBAL_CONST(
+            output_path=os.path.join(directory, "bench.nc"),
+            output_queue=0,
+            verbosity=0,
+            **kwargs,
+        )
+    )
+    grid.grid(state)
+    init.init_case(state)
+    boundary_conditions.boundary_conditions(state)
+    trend.trend(state)  # warm-up (thread pool, numba compilation)
+    return state
+
+
+def _peak(function):
+    # memory peak in MiB of the allocations during one call
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def _time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_kernels(NJ, NK, NL, backend, layout, repeat):
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        state = _state(directory, NJ=NJ, NK=NK, NL=NL, BACKEND=backend, LAYOUT=layout)
+        output.init_output(state)
+        output.fill_output(state)
+        state.scalar.ntout = 1  # time the output steps after the initial one
+        kernels = {
+            "trend": lambda: trend.trend(state),
+            "boundary_conditions": lambda: boundary_conditions.boundary_conditions(
+                state, static=False
+            ),
+            "fill_output": lambda: output.fill_output(state),
+        }
+        for name, function in kernels.items():
+            times = _time(function, repeat)
+            records.append(
+                dict(
+                    benchmark=name,
+                    NJ=NJ,
+                    NK=NK,
+                    NL=NL,
+                    backend=backend,
+                    layout=layout,
+                    ms_best=1e3 * min(times),
+                    ms_mean=1e3 * float(np.mean(times)),
+                    memory_peak_mib=_peak(function),
+                )
+            )
+        output.close(state)
+    return records
+
+
+def bench_run(NJ, NK, NL, IEXP, backend, layout, steps):
+    with tempfile.TemporaryDirectory() as directory:
+        config = dict(
+            NJ=NJ,
+            NK=NK,
+            NL=NL,
+            IEXP=IEXP,
+            SEED=0,
+            BACKEND=backend,
+            LAYOUT=layout,
+            TF=steps * GLOBAL_CONST.DT / 3600,
+            VERBOSE=0,
+            OUT=os.path.join(directory, "run.nc"),
+        )
+        # unstable configurations are timed too, flagged by finite=False
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            start = time.perf_counter()
+            state = model.run(**config)
+            seconds = time.perf_counter() - start
+            memory = _peak(lambda: model.run(**config))
+    return dict(
+        benchmark="run",
+        NJ=NJ,
+        NK=NK,
+        NL=NL,
+        IEXP=IEXP,
+        backend=backend,
+        layout=layout,
+        steps=steps,
+        seconds=seconds,
+        steps_per_second=steps / seconds,
+        simulated_hours_per_wall_hour=steps * GLOBAL_CONST.DT / seconds,
+        memory_peak_mib=memory,
+        finite=bool(np.isfinite(state.array.ps).all()),
+    )
+
+
+def _key(record):
+    # results of versions without the layout option are "column" results
+    record = dict(dict(layout="column"), **record)
+    return tuple(
+        record.get(name)
+        for name in [
+            "benchmark",
+            "NJ",
+            "NK",
+            "NL",
+            "IEXP",
+            "backend",
+            "layout",
+            "steps",
+        ]
+    )
+
+
+def _label(record):
+    label = f"{record['benchmark']} {record['NJ']}x{record['NK']}x{record['NL']}"
+    if "IEXP" in record:
+        label += f" IEXP={record['IEXP']}"
+    label += f" {record['backend']}"
+    if record.get("layout", "column") != "column":
+        label += f" {record['layout']}"
+    return label
+
+
+def _print(record):
+    if record["benchmark"] == "run":
+        print(
+            f"{_label(record):<44} {record['steps_per_second']:>10.1f} steps/s"
+            f" {record['memory_peak_mib']:>9.1f} MiB"
+        )
+    else:
+        print(
+            f"{_label(record):<44} {record['ms_best']:>10.2f} ms     "
+            f" {record['memory_peak_mib']:>9.1f} MiB"
+        )
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict(
+        commit=commit,
+        date=datetime.now().isoformat(timespec="seconds"),
+        python=platform.python_version(),
+        numpy=np.__version__,
+        machine=platform.machine(),
+        cpus=os.cpu_count(),
+    )
+
+
+def compare(old_path, new_path):
+    #
+    # speed-up of the new results over the old ones, > 1 is faster
+    #
+    with open(old_path) as f:
+        old = {_key(record): record for record in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    print(f"{'benchmark':<44} {'old':>10} {'new':>10} {'speed-up':>9}")
+    for record in new:
+        base = old.get(_key(record))
+        if base is None:
+            continue
+        if record["benchmark"] == "run":
+            a, b = base["steps_per_second"], record["steps_per_second"]
+            print(f"{_label(record):<44} {a:>10.1f} {b:>10.1f} {b / a:>9.2f}")
+        else:
+            a, b = base["ms_best"], record["ms_best"]
+            print(f"{_label(record):<44} {a:>10.2f} {b:>10.2f} {a / b:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smallest grid only")
+    parser.add_argument("--steps", type=int, default=20, help="time steps per run")
+    parser.add_argument("--repeat", type=int, default=10, help="calls per kernel")
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("--layout", default="column", help='"column" or "level"')
+    parser.add_argument("--save", help="store the results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    resolutions = RESOLUTIONS[:1] if args.quick else RESOLUTIONS
+    levels = LEVELS[:1] if args.quick else LEVELS
+    results = []
+    for NJ, NK in resolutions:
+        for NL in levels:
+            for record in bench_kernels(
+                NJ, NK, NL, args.backend, args.layout, args.repeat
+            ):
+                _print(record)
+                results.append(record)
+            for IEXP in EXPERIMENTS:
+                record = bench_run(
+                    NJ, NK, NL, IEXP, args.backend, args.layout, args.steps
+                )
+                _print(record)
+                results.append(record)
+            sys.stdout.flush()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(dict(_metadata(), results=results), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
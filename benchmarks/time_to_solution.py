@@ -0,0 +1,101 @@
+"""Time to solution of the semi-implicit scheme against the leapfrog scheme.
+
+Integrates the same experiment with SCHEME="leapfrog" at its time step
+and with SCHEME="semi-implicit" at several larger time steps, with
+--polar LAT also with the leapfrog scheme and the polar filter
+POLAR=LAT at these time steps. Prints the wall time, the speed-up over
+the leapfrog run, whether the run stayed finite and the RMS and maximum
+deviation of the final output from the leapfrog run.
+
+Usage: python benchmarks/time_to_solution.py [--iexp N] [--tf HOURS] [--nj NJ --nk NK --nl NL]
+                                             [--dt DT] [--dts DT1 DT2 ...] [--polar LAT]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import netCDF4
+import numpy as np
+
+from globagrim import model
+
+VARIABLES = ["PSG", "T", "U", "V"]
+
+
+def _final(path):
+    with netCDF4.Dataset(path) as ds:
+        return {v: ds[v][-1].astype(np.float64) for v in VARIABLES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iexp", type=int, default=1)
+    parser.add_argument("--tf", type=float, default=24.0, help="hours")
+    parser.add_argument("--nj", type=int, default=72)
+    parser.add_argument("--nk", type=int, default=36)
+    parser.add_argument("--nl", type=int, default=10)
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("--dt", type=float, default=60.0, help="leapfrog time step")
+    parser.add_argument(
+        "--dts",
+        type=float,
+        nargs="+",
+        default=[60.0, 120.0, 240.0, 480.0],
+        help="semi-implicit time steps",
+    )
+    parser.add_argument(
+        "--polar", type=float, help="latitude of the polar filter of leapfrog runs"
+    )
+    args = parser.parse_args()
+
+    config = dict(
+        IEXP=args.iexp,
+        SEED=0,
+        NJ=args.nj,
+        NK=args.nk,
+        NL=args.nl,
+        TF=args.tf,
+        INT=args.tf,
+        BACKEND=args.backend,
+        VERBOSE=0,
+    )
+    runs = [("leapfrog", args.dt, {})]
+    runs += [("semi-implicit", dt, dict(SCHEME="semi-implicit")) for dt in args.dts]
+    if args.polar is not None:
+        runs += [("polar filter", dt, dict(POLAR=args.polar)) for dt in args.dts]
+    with tempfile.TemporaryDirectory() as directory:
+        print(
+            f"{'scheme':<14} {'DT [s]':>7} {'steps':>6} {'wall [s]':>9} {'speed-up':>9}"
+            f" {'finite':>7} " + " ".join(f"{v + ' RMS / max':>21}" for v in VARIABLES)
+        )
+        reference = None
+        for scheme, dt, options in runs:
+            path = os.path.join(directory, f"{scheme.replace(' ', '')}{dt:g}.nc")
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                start = time.perf_counter()
+                state = model.run(OUT=path, DT=dt, **options, **config)
+                seconds = time.perf_counter() - start
+            finite = bool(np.isfinite(state.array.ps).all())
+            fields = _final(path)
+            if reference is None:
+                reference, reference_seconds = fields, seconds
+            cells = []
+            for v in VARIABLES:
+                deviation = fields[v] - reference[v]
+                cells.append(
+                    f"{np.sqrt(np.mean(deviation**2)):>10.3e}"
+                    f" {np.abs(deviation).max():>10.3e}"
+                )
+            print(
+                f"{scheme:<14} {dt:>7g} {int(args.tf * 3600 / dt + 0.5):>6}"
+                f" {seconds:>9.1f} {reference_seconds / seconds:>9.2f} {finite!s:>7} "
+                + " ".join(cells)
+            )
+
+
+if __name__ == "__main__":
+    main()
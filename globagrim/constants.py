@@ -21,6 +21,19 @@ class GLOBAL_CONST:
     FKAP = RD / CP  # heat capacity ratio
     T0 = 250.0  # reference temperature
     IEXP = 1  # experiment number
+    BACKEND = "numpy"  # trend computation ("numpy", "numba" or "reference" loops)
+    DTYPE = "float64"  # floating point type of the model arrays ("float64" or "float32")
+    ACC64 = True  # vertical sums (geopotential, mass flow) in float64 for float32 arrays
+    LEAN = False  # sum up the trend terms in place instead of storing them
+    SCHEME = "leapfrog"  # time integration ("leapfrog" or "semi-implicit" gravity waves)
+    ASSELIN = 0.0  # Robert-Asselin filter coefficient of the leapfrog scheme, 0 switches it off
+    WILLIAMS = 0.53  # share of the filter displacement on the current level (1 Robert-Asselin, 0.53 Williams)
+    CFL = None  # target Courant number of an adaptive time step, None keeps DT fixed
+    CFL_INT = 10  # time steps between two checks of the Courant number
+    POLAR = None  # latitude in degrees poleward of which the trends are Fourier filtered, None filters nothing
+    LAYOUT = "column"  # memory order of the 2D/3D arrays ("column" or "level" planes)
+    SEED = None  # seed of the random initial conditions (IEXP=3)
+    NTHREADS = 1  # number of threads computing latitude bands of the trend
     NTFIL = 8640  # number of filter time steps if lfin=.true.
     FKD = 2.0e5  # diffusion coefficient if LDIFF=.true.
     #    LDIFF = True  # switch for horizontal diffusion
@@ -28,6 +41,31 @@ class GLOBAL_CONST:
     #
     output_path = os.path.join("output.nc")
     output_int = 0 # output intervall in hours
+    output_buffer = 10  # number of output steps written to the file at once
+    output_queue = 2  # output steps queued for the writer thread, 0 writes in the time loop
+    output_vars = ("SE", "PSG", "T", "U", "V")  # variables written to the output
+    output_zlib = False  # zlib compression of the output variables
+    output_complevel = 4  # zlib compression level (1-9)
+    output_shuffle = True  # byte shuffle filter before compression
+    output_lsd = None  # least significant digit kept, int for all or dict per variable
+    output_chunks = None  # chunk layout (None one buffer flush, "map" or "time")
+    verbosity = 1  # 0 warnings only, 1 run information and progress, 2 every time step
+    report_int = 10.0  # seconds between two progress messages
+    profile_path = None  # kernel timings written as JSON, None runs without profiling
+    restart_int = 0  # restart file intervall in hours, 0 writes no restart files
+    restart_path = "restart.npz"  # restart file written every restart_int hours
+    restart_file = None  # restart file the run continues from
     ndmon = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
 
+    def __init__(self, **kwargs):
+        #
+        # configuration of a model run, keyword arguments override the
+        # defaults above
+        #
+        for name, value in kwargs.items():
+            if not hasattr(GLOBAL_CONST, name):
+                raise AttributeError("Unknown model constant: " + name)
+            setattr(self, name, value)
+
+
 global_const = GLOBAL_CONST()
\ No newline at end of file
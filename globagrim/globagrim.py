@@ -1,151 +1,275 @@
-def globagrim():
-    from .variables import global_const, global_int, global_array
+import math
+import time
+
+import numpy as np
+
+
+SCHEMES = ["leapfrog", "semi-implicit"]
+
+
+def _time_step(state, ps, u, v, t, dt):
+    from . import semi_implicit
+
+    #
+    #     future time level from the given level and the current trends,
+    #     written in place into the future buffers
+    #
+    if state.const.SCHEME == "semi-implicit":
+        semi_implicit.time_step(state, ps, u, v, t, dt)
+        return
+    array = state.array
+    for start, trend, future in (
+        (ps, array.pst, array.psn),
+        (u, array.ut, array.un),
+        (v, array.vt, array.vn),
+        (t, array.tt, array.tn),
+    ):
+        np.multiply(trend, dt, out=future)
+        future += start
+
+
+def _due(ti, dt, interval):
+    #
+    #     whether a multiple of the interval (hours) ends within the last
+    #     time step (ti - dt, ti], an interval of 0 is every time step
+    #
+    if interval == 0:
+        return True
+    seconds = interval * 3600
+    return math.floor(ti / seconds + 1e-9) > math.floor((ti - dt) / seconds + 1e-9)
+
+
+def _checkpoint(state, n, euler=False):
+    from . import output
+    from . import progress
+    from . import restart
+
+    #
+    #     restart file after time step n, the output written so far is
+    #     flushed first so that the restart never runs ahead of the output
+    #
+    output.sync(state)
+    restart.write_restart(state, n, euler)
+    progress.log(state, 1, "Write restart file: %s", state.const.restart_path)
+
+
+def globagrim(state):
+    from . import output
+
+    #
+    #     the output written so far is closed also if the run fails
+    #
+    try:
+        _integrate(state)
+    finally:
+        output.close(state)
+
+
+def _integrate(state):
     from . import grid
     from . import init
     from . import boundary_conditions
     from . import trend
     from . import output
+    from . import profiling
+    from . import progress
+    from . import restart
+    from . import timestep
 
     #
     #     global atmospheric grid point model [GlobAGiM]
     #
-    print("Number of longitudes: ", global_const.NJ)
-    print("Number of latitudes: ", global_const.NK)
-    print("Number of model time steps: ", init.nt)
-    if global_const.output_int == 0:
+    start = time.perf_counter()
+    const = state.const
+    scalar = state.scalar
+    array = state.array
+    if const.SCHEME not in SCHEMES:
+        raise ValueError("Unknown time scheme: " + str(const.SCHEME))
+    nt = int(const.TF * 3600 / const.DT + 0.5)  # number of time steps
+    progress.log(state, 1, "Number of longitudes: %d", const.NJ)
+    progress.log(state, 1, "Number of latitudes: %d", const.NK)
+    progress.log(state, 1, "Number of model time steps: %d", nt)
+    if const.output_int == 0:
         nout = 1
     else:
-        nout =   global_const.output_int*3600/global_const.DT
-    print("Output every ", nout, " model time steps")
+        nout =   const.output_int*3600/const.DT
+    progress.log(state, 1, "Output every %g model time steps", nout)
+    tend = const.TF * 3600  # end of the integration in seconds
 
     #
     #     init model grid
     #
-    grid.grid()
-    #
-    #     init variabales
-    #
-    init.init_case()
-    #
-    #     apply boundary conditions
-    #
-    boundary_conditions.boundary_conditions()
-    #
-    #     calculate trend
-    #
-    trend.trend()
-    #
-    #     init output
-    #
-    output.init_output()
-    #
-    #     fill output
-    #
-    output.fill_output()
-    print("---")
-    #
-    #     first time step with Euler method
-    #
-    global_array.psn[:, :] = (
-        global_array.ps[:, :] + global_const.DT * global_array.pst[:, :]
-    )
-    global_array.un[:, :, :] = (
-        global_array.u[:, :, :] + global_const.DT * global_array.ut[:, :, :]
-    )
-    global_array.vn[:, :, :] = (
-        global_array.v[:, :, :] + global_const.DT * global_array.vt[:, :, :]
-    )
-    global_array.tn[:, :, :] = (
-        global_array.t[:, :, :] + global_const.DT * global_array.tt[:, :, :]
-    )
-#    global_array.ti = global_int.ti + global_const.DT / 3600.0
-    n = 0
+    grid.grid(state)
+    controller = None if const.CFL is None else timestep.CFL_CONTROL(state)
+    if const.restart_file is None:
+        #
+        #     init variabales
+        #
+        init.init_case(state)
+        #
+        #     apply boundary conditions
+        #
+        boundary_conditions.boundary_conditions(state)
+        #
+        #     calculate trend
+        #
+        profiling.call(state, trend.trend, state)
+        #
+        #     init output
+        #
+        output.init_output(state)
+        #
+        #     fill output
+        #
+        output.fill_output(state)
+        if controller is not None:
+            #
+            #     smaller first time step if DT exceeds the target CFL
+            #
+            dt = controller.adapt(-1, grow=False)
+            if dt is not None:
+                const.DT = dt
+                nt = int(tend / const.DT + 0.5)
+            progress.log(
+                state, 1, "Time step: %g s (CFL %.2f)", const.DT, controller.cfl
+            )
+        reporter = progress.PROGRESS(state, -1, nt)
+        #
+        #     first time step with Euler method
+        #
+        profiling.call(
+            state,
+            _time_step,
+            state,
+            array.ps,
+            array.u,
+            array.v,
+            array.t,
+            const.DT,
+        )
+    #    scalar.ti = scalar.ti + const.DT / 3600.0
+        n = 0
+        euler = False  # Euler step after a change of DT
     
-    global_int.ti = global_int.ti +global_const.DT
-    #
-    #     rewrite results
-    #
-    global_array.psa[:, :] = global_array.ps[:, :]
-    global_array.ua[:, :, :] = global_array.u[:, :, :]
-    global_array.va[:, :, :] = global_array.v[:, :, :]
-    global_array.ta[:, :, :] = global_array.t[:, :, :]
-    global_array.ps[:, :] = global_array.psn[:, :]
-    global_array.u[:, :, :] = global_array.un[:, :, :]
-    global_array.v[:, :, :] = global_array.vn[:, :, :]
-    global_array.t[:, :, :] = global_array.tn[:, :, :]
-    #
-    print(
-        "Model time step: ",
-        n,
-        ", Elapsed model time: ",
-        (n + 1) * global_const.DT / 60,
-        " minutes",
-    )
+        scalar.ti = scalar.ti +const.DT
+        #
+        #     rewrite results
+        #
+        array.advance_time_levels()
+        #
+        reporter.step(n)
     
-    if nout == 1:
-        global_int.ntout += 1
-        output.fill_output()
-        
-    print("---")
+        if _due(scalar.ti, const.DT, const.output_int):
+            scalar.ntout += 1
+            profiling.call(state, output.fill_output, state)
+        if const.restart_int > 0 and _due(scalar.ti, const.DT, const.restart_int):
+            profiling.call(state, _checkpoint, state, n)
+    else:
+        #
+        #     continue from the checkpoint, appending to its output
+        #
+        n, euler = restart.read_restart(state)
+        progress.log(state, 1, "Restart after model time step: %d", n)
+        if controller is not None:
+            nt = n + 1 + int((tend - scalar.ti) / const.DT + 0.5)
+        output.init_output(state)
+        reporter = progress.PROGRESS(state, n, nt)
     #
     #     time loop
     #
-    for n in range(1, init.nt):
+    while n + 1 < nt:
+        n += 1
         #
         #       calculate trend
         #
-        trend.trend()
-        #
-        #       time step with Leap-Frog
-        #
-        global_array.psn[:, :] = (
-            global_array.psa[:, :] + 2.0 * global_const.DT * global_array.pst[:, :]
-        )
-        global_array.un[:, :, :] = (
-            global_array.ua[:, :, :] + 2.0 * global_const.DT * global_array.ut[:, :, :]
-        )
-        global_array.vn[:, :, :] = (
-            global_array.va[:, :, :] + 2.0 * global_const.DT * global_array.vt[:, :, :]
-        )
-        global_array.tn[:, :, :] = (
-            global_array.ta[:, :, :] + 2.0 * global_const.DT * global_array.tt[:, :, :]
-        )
-        global_array.ti = global_int.ti + global_const.DT / 3600.0
+        profiling.call(state, trend.trend, state)
+        if euler:
+            #
+            #       time step with Euler method
+            #
+            profiling.call(
+                state, _time_step, state, array.ps, array.u, array.v, array.t, const.DT
+            )
+            euler = False
+        else:
+            #
+            #       time step with Leap-Frog and time filter
+            #
+            profiling.call(
+                state,
+                _time_step,
+                state,
+                array.psa,
+                array.ua,
+                array.va,
+                array.ta,
+                2.0 * const.DT,
+            )
+            if const.ASSELIN:
+                profiling.call(state, timestep.asselin_filter, state)
         #
         #       rewrite Results
         #
-        global_array.psa[:, :] = global_array.ps[:, :]
-        global_array.ua[:, :, :] = global_array.u[:, :, :]
-        global_array.va[:, :, :] = global_array.v[:, :, :]
-        global_array.ta[:, :, :] = global_array.t[:, :, :]
-        global_array.ps[:, :] = global_array.psn[:, :]
-        global_array.u[:, :, :] = global_array.un[:, :, :]
-        global_array.v[:, :, :] = global_array.vn[:, :, :]
-        global_array.t[:, :, :] = global_array.tn[:, :, :]
+        array.advance_time_levels()
         #
         #       apply boundary conditions
         #
-        boundary_conditions.boundary_conditions()
-        #
-        print(
-            "Model time step: ",
-            n,
-            ", Time: ",
-            (n + 1) * global_const.DT / 60,
-            " minutes",
+        profiling.call(
+            state, boundary_conditions.boundary_conditions, state, static=False
         )
-
-        global_int.ti = global_int.ti +global_const.DT
+        #
+        scalar.ti = scalar.ti +const.DT
+        reporter.step(n)
         
-        if (n+1) % nout == 0:
-#            global_int.nmin = global_int.nmin + int(init.dtout + 0.5)
-            global_int.ntout += 1
-            output.fill_output()
-
-        print("---")
+        if _due(scalar.ti, const.DT, const.output_int):
+#            scalar.nmin = scalar.nmin + int(dtout + 0.5)
+            scalar.ntout += 1
+            profiling.call(state, output.fill_output, state)
+        checkpoint = const.restart_int > 0 and _due(
+            scalar.ti, const.DT, const.restart_int
+        )
+        #
+        #       adapt the time step to the target CFL every CFL_INT steps
+        #
+        if controller is not None and (n + 1) % const.CFL_INT == 0 and n + 1 < nt:
+            dt = controller.adapt(n)
+            if dt is not None:
+                progress.log(
+                    state,
+                    1,
+                    "Time step: %g s after model time step %d (CFL %.2f)",
+                    dt,
+                    n,
+                    controller.cfl,
+                )
+                const.DT = dt
+                nt = n + 1 + int((tend - scalar.ti) / const.DT + 0.5)
+                reporter.nt = nt
+                euler = True
+        #
+        #       restart file with the time step and scheme of the next step
+        #
+        if checkpoint:
+            profiling.call(state, _checkpoint, state, n, euler)
 
-    output.close()
+    scalar.nsteps = n - reporter.n0
+    profiling.call(state, output.close, state)
+    reporter.finish()
+    if state.profile is not None:
+        state.profile.wall_time = time.perf_counter() - start
+        progress.log(state, 1, "Profile:\n%s", state.profile.report())
+        state.profile.write_json(
+            const.profile_path,
+            steps=scalar.nsteps,
+            NJ=const.NJ,
+            NK=const.NK,
+            NL=const.NL,
+            BACKEND=const.BACKEND,
+            NTHREADS=const.NTHREADS,
+        )
 
 
 if __name__ == "__main__":
-    globagrim()
+    from .variables import ModelState
+
+    globagrim(ModelState())
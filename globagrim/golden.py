@@ -0,0 +1,134 @@
+import os
+import tempfile
+
+import numpy as np
+
+#
+# golden output regression harness: snapshots of ps/u/v/t after a fixed
+# number of time steps of every experiment, computed with the reference
+# loops, against which the optimized backends and integrators are compared
+#
+FIELDS = ["ps", "u", "v", "t"]
+EXPERIMENTS = [1, 2, 3]
+CONFIG = dict(NJ=24, NK=12, NL=4, DT=15.0, SEED=0)  # small grid for the loops
+STEPS = 10
+
+#
+# default tolerances per field relative to the largest magnitude of the
+# golden field, float64 backends reproduce the reference within rounding
+#
+TOLERANCES = {"ps": 1.0e-12, "u": 1.0e-12, "v": 1.0e-12, "t": 1.0e-12}
+FLOAT32_TOLERANCES = {"ps": 1.0e-5, "u": 1.0e-5, "v": 1.0e-5, "t": 1.0e-5}
+
+
+def _path(directory, iexp):
+    return os.path.join(directory, "golden_iexp" + str(iexp) + ".npz")
+
+
+def _run(iexp, steps, **kwargs):
+    # final state of a run without output files and messages
+    from . import model
+
+    config = dict(CONFIG, **kwargs)
+    config["TF"] = steps * config["DT"] / 3600
+    with tempfile.TemporaryDirectory() as directory:
+        state = model.run(
+            IEXP=iexp,
+            VERBOSE=0,
+            QUEUE=0,
+            OUT=os.path.join(directory, "golden.nc"),
+            **config
+        )
+    inner = (slice(1, -1), slice(1, -1))
+    return {name: getattr(state.array, name)[inner] for name in FIELDS}
+
+
+def generate(directory, steps=STEPS, experiments=EXPERIMENTS):
+    #
+    # golden snapshots of the reference backend, one compressed file per
+    # experiment with its configuration
+    #
+    os.makedirs(directory, exist_ok=True)
+    for iexp in experiments:
+        fields = _run(iexp, steps, BACKEND="reference")
+        np.savez_compressed(_path(directory, iexp), steps=steps, **CONFIG, **fields)
+
+
+def compare(directory, tolerances=None, experiments=EXPERIMENTS, **kwargs):
+    #
+    # run every experiment with the configuration kwargs (e.g. BACKEND,
+    # NTHREADS) and return one record per experiment and field with the
+    # maximum and RMS deviation from the golden snapshot
+    #
+    tolerances = dict(TOLERANCES, **(tolerances or {}))
+    records = []
+    for iexp in experiments:
+        with np.load(_path(directory, iexp)) as data:
+            golden = {name: data[name] for name in FIELDS}
+            config = {name: data[name].item() for name in CONFIG}
+            steps = int(data["steps"])
+        fields = _run(iexp, steps, **dict(config, **kwargs))
+        for name in FIELDS:
+            deviation = fields[name].astype(np.float64) - golden[name]
+            scale = np.abs(golden[name]).max() or 1.0
+            max_deviation = float(np.abs(deviation).max())
+            records.append(
+                dict(
+                    IEXP=iexp,
+                    field=name,
+                    max=max_deviation,
+                    rms=float(np.sqrt(np.mean(deviation**2))),
+                    relative_max=max_deviation / scale,
+                    tolerance=tolerances[name],
+                    passed=bool(max_deviation <= tolerances[name] * scale),
+                )
+            )
+    return records
+
+
+def report(records):
+    lines = [
+        "%4s %5s %12s %12s %12s %10s %6s"
+        % ("IEXP", "field", "max", "rms", "rel. max", "tolerance", "")
+    ]
+    for record in records:
+        lines.append(
+            "%4d %5s %12.4e %12.4e %12.4e %10.1e %6s"
+            % (
+                record["IEXP"],
+                record["field"],
+                record["max"],
+                record["rms"],
+                record["relative_max"],
+                record["tolerance"],
+                "ok" if record["passed"] else "FAILED",
+            )
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="golden output of the reference backend and comparison"
+    )
+    parser.add_argument("command", choices=["generate", "compare"])
+    parser.add_argument("--dir", default=os.path.join("tests", "golden"))
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("--nthreads", type=int, default=1)
+    parser.add_argument("--dtype", default="float64")
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate(args.dir)
+    else:
+        records = compare(
+            args.dir,
+            FLOAT32_TOLERANCES if args.dtype == "float32" else None,
+            BACKEND=args.backend,
+            NTHREADS=args.nthreads,
+            DTYPE=args.dtype,
+        )
+        print(report(records))
+        if not all(record["passed"] for record in records):
+            raise SystemExit(1)
@@ -1,89 +1,105 @@
-from .variables import global_array, global_const, global_int
 import numpy as np
 
+from . import polar
 
-def grid():
+
+def grid(state):
     #
     # determine longitude and latitude and add boundary conditions
     #
-    global_array.dlam = 360 / global_const.NJ
-    global_array.flam_deg[1 : global_const.NJ + 1] = np.arange(
-        0, 360, global_array.dlam
-    )
-    global_array.flam_deg[0] = global_array.flam_deg[global_const.NJ]
-    global_array.flam_deg[global_const.NJ + 1] = global_array.flam_deg[1]
+    const = state.const
+    array = state.array
+    scalar = state.scalar
+    array.dlam = 360 / const.NJ
+    array.flam_deg[1 : const.NJ + 1] = np.arange(0, 360, array.dlam)
+    array.flam_deg[0] = array.flam_deg[const.NJ]
+    array.flam_deg[const.NJ + 1] = array.flam_deg[1]
+    #
+    dphi = 180 / const.NK
+    array.phi_deg[1 : const.NK + 1] = np.arange(-90 + 0.5 * dphi, 90 + 0.5 * dphi, dphi)
+    array.phi_deg[0] = array.phi_deg[1]
+    array.phi_deg[const.NK + 1] = array.phi_deg[const.NK]
     #
-    dphi = 180 / global_const.NK
-    global_array.phi_deg[1 : global_const.NK + 1] = np.arange(
-        -90 + 0.5 * dphi, 90 + 0.5 * dphi, dphi
-    )
-    global_array.phi_deg[0] = global_array.phi_deg[1]
-    global_array.phi_deg[global_const.NK + 1] = global_array.phi_deg[global_const.NK]
+    # convert to radian measure
     #
-    # convert to radian measuglobal_const.RE
+    array.dlam = const.pi / 180.0 * array.dlam
+    array.flam[:] = const.pi / 180.0 * array.flam_deg
+    dphi = const.pi / 180.0 * dphi
+    array.phi[:] = const.pi / 180.0 * array.phi_deg
     #
-    global_array.dlam = global_const.pi / 180.0 * global_array.dlam
-    global_array.flam[:] = global_const.pi / 180.0 * global_array.flam_deg
-    dphi = global_const.pi / 180.0 * dphi
-    global_array.phi[:] = global_const.pi / 180.0 * global_array.phi_deg
+    # index of the longitude on the opposite side of the pole (used for the
+    # polar boundary conditions)
+    #
+    array.joppos[:] = np.arange(0, const.NJ + 1) + int(const.NJ / 2)
+    array.joppos[array.joppos > const.NJ] -= const.NJ
     #
     # calculation of metric grid width
     #
-    global_array.dx[:] = (
-        global_const.RE * np.cos(global_array.phi) * global_array.dlam
-    )  # dependent on latitude
-    global_array.dy = global_const.RE * dphi
+    array.dx[:] = const.RE * np.cos(array.phi) * array.dlam  # dependent on latitude
+    array.dy = const.RE * dphi
     #
     # calculation latitide cosine and sine
     #
-    global_array.cs[:] = np.cos(global_array.phi)
-    global_array.sn[:] = np.sin(global_array.phi)
+    array.cs[:] = np.cos(array.phi)
+    array.sn[:] = np.sin(array.phi)
     #
     # calculation coriolis parameter
     #
-    global_array.f[:] = 2 * global_const.OM * global_array.sn[0 : global_const.NK + 2]
+    array.f[:] = 2 * const.OM * array.sn[0 : const.NK + 2]
     #
-    # calculation vertical cooglobal_const.RDinate SIGMA
+    # calculation vertical coordinate SIGMA
     #
     #
     # increment
     #
-    global_int.dsig = 1.0 / global_const.NL
+    scalar.dsig = 1.0 / const.NL
     #
     # full SIGMA surfaces
     #
-    global_array.sigma[:] = (np.arange(global_const.NL + 1) + 1) * global_int.dsig
+    array.sigma[:] = (np.arange(const.NL + 1) + 1) * scalar.dsig
     #
     # half SIGMA surfaces
     #
-    global_array.sigmah[:] = (np.arange(global_const.NL) + 0.5) * global_int.dsig
+    array.sigmah[:] = (np.arange(const.NL) + 0.5) * scalar.dsig
     #
     # hight dependent coefficient alpha
     #
-    global_array.alp[:] = np.full(global_const.NL, np.nan)
-    for l in range(0, global_const.NL - 1):
-        global_array.alp[l] = 0.5 * np.log(
-            global_array.sigmah[l + 1] / global_array.sigmah[l]
-        )
-    global_array.alp[global_const.NL - 1] = np.log(
-        1.0 / global_array.sigmah[global_const.NL - 1]
-    )
+    array.alp[:] = np.full(const.NL, np.nan)
+    for l in range(0, const.NL - 1):
+        array.alp[l] = 0.5 * np.log(array.sigmah[l + 1] / array.sigmah[l])
+    array.alp[const.NL - 1] = np.log(1.0 / array.sigmah[const.NL - 1])
 
     #
     # calculation of geopotential
     #
-    global_array.gp0[global_const.NL - 1] = (
-        global_const.RD * global_const.T0 * global_array.alp[global_const.NL - 1]
-    )
-    for l in range(global_const.NL - 2, -1, -1):
-        global_array.gp0[l] = (
-            global_array.gp0[l + 1]
-            + 2.0 * global_const.RD * global_const.T0 * global_array.alp[l]
-        )
+    array.gp0[const.NL - 1] = const.RD * const.T0 * array.alp[const.NL - 1]
+    for l in range(const.NL - 2, -1, -1):
+        array.gp0[l] = array.gp0[l + 1] + 2.0 * const.RD * const.T0 * array.alp[l]
+    #
+    # metric coefficients of the trend kernels, the divisions by the grid
+    # width become multiplications
+    #
+    array.rdx2[:] = 1.0 / (2.0 * array.dx)  # centered zonal difference
+    array.rdx4[:] = 1.0 / (4.0 * array.dx)  # zonal flux divergence
+    array.rdy2 = 1.0 / (2.0 * array.dy)  # centered meridional difference
+    array.rcsdy2[:] = 1.0 / (2.0 * array.cs * array.dy)  # meridional divergence
+    array.fcen[:] = array.sn / array.cs / const.RE  # centrifugal term
+    array.rdalp[:] = const.RD * array.alp  # hydrostatic equation
+    array.ralps[0] = np.nan  # not used
+    array.ralps[1:] = (array.alp[1:] + array.alp[:-1]) / scalar.dsig  # compression heat
+    array.r2dsig = 1.0 / (2.0 * scalar.dsig)  # vertical flux divergence
+    #
+    # damping factors of the polar Fourier filter, kept on the state (not
+    # sliced into latitude bands or ensemble members)
+    #
+    if const.POLAR is not None:
+        state.polar = polar.factors(state)
 
 
 ####################################################
 
 
 if __name__ == "__main__":
-    grid()
+    from .variables import ModelState
+
+    grid(ModelState())
@@ -0,0 +1,51 @@
+#
+# index helpers of the model arrays (lon, lat, level) with one halo point
+# on each side of the horizontal grid, shared by the trend kernels, the
+# semi-implicit solver and the time step control
+#
+
+
+def field(dj=0, dk=0):
+    #
+    # index of the interior of a 3D field, shifted by dj/dk grid points
+    #
+    return (
+        Ellipsis,
+        slice(1 + dj, dj - 1 or None),
+        slice(1 + dk, dk - 1 or None),
+        slice(None),
+    )
+
+
+def surface(dj=0, dk=0):
+    #
+    # index of the interior of a 2D field, shifted by dj/dk grid points and
+    # broadcastable against 3D fields
+    #
+    return (
+        Ellipsis,
+        slice(1 + dj, dj - 1 or None),
+        slice(1 + dk, dk - 1 or None),
+        None,
+    )
+
+
+def layer(l):
+    #
+    # index of the interior of level l of a 3D field
+    #
+    return (Ellipsis, slice(1, -1), slice(1, -1), l)
+
+
+def levels(l0, l1):
+    #
+    # index of the interior of levels l0 <= l < l1 of a 3D field
+    #
+    return (Ellipsis, slice(1, -1), slice(1, -1), slice(l0, l1))
+
+
+def metric(a, dk=0):
+    #
+    # latitude dependent grid quantity, broadcastable against 3D fields
+    #
+    return a[1 + dk : dk - 1 or None, None]
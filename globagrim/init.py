@@ -1,117 +1,133 @@
 import numpy as np
-from .variables import global_array, global_const
 
-nt = int(global_const.TF * 3600 / global_const.DT + 0.5)  # number of time steps
-dtout = global_const.DT * global_const.NOUT / 60  # output interval in min
-ntout = nt / global_const.NOUT + 1  # output time steps
+from . import progress
+
+#
+# registry of the initial conditions, experiment number -> function(state),
+# new cases are added with the decorator
+#
+#   @init.case(4)
+#   def my_case(state):
+#       ...
+#
+CASES = {}
+
+
+def case(iexp):
+    def register(function):
+        CASES[iexp] = function
+        return function
+
+    return register
+
+
+def _lonlat(state):
+    #
+    # longitude and latitude of the inner grid points broadcast to
+    # (NJ, 1) and (1, NK)
+    #
+    const = state.const
+    array = state.array
+    flam = array.flam[1 : const.NJ + 1, np.newaxis]
+    phi = array.phi[np.newaxis, 1 : const.NK + 1]
+    return flam, phi
+
 
 #
 # define cases
 #
 
+
 # Case 1: Initial low pressure system
-def low_pressure_system():
+@case(1)
+def low_pressure_system(state):
+    const = state.const
+    array = state.array
     delp = 1000
-    phic = global_const.pi / 4
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            global_array.ps[j, k] = -delp * np.exp(
-                -(
-                    (global_array.flam[j] - global_const.pi) ** 2
-                    + (global_array.phi[k] - phic)
-                    ** 2
-                )
-                / 0.05
-            )
+    phic = const.pi / 4
+    flam, phi = _lonlat(state)
+    array.ps[1 : const.NJ + 1, 1 : const.NK + 1] = -delp * np.exp(
+        -((flam - const.pi) ** 2 + (phi - phic) ** 2) / 0.05
+    )
 
 
 # Case 2: Stream over an isolated montain (Williamson test similation)
-def montain_flow():
+@case(2)
+def montain_flow(state):
+    const = state.const
+    array = state.array
     u0 = 20.0
-    phis0 = global_const.G * 2000.0
-    flamc = 3.0 * global_const.pi / 2.0
-    phic = global_const.pi / 6.0
-    distm = global_const.pi / 9.0
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            dist = np.sqrt(
-                (global_array.flam[j] - flamc) ** 2 + (global_array.phi[k] - phic) ** 2
-            )
-            if dist < distm:
-                global_array.phis[j, k] = phis0 * (1.0 - dist / distm)
-            else:
-                global_array.phis[j, k] = 0.0
-            global_array.ps[j, k] = (
-                -global_const.RHOS * global_array.phis[j, k]
-                - global_const.RHOS
-                * u0
-                * global_const.RE
-                / 2.0
-                * (2.0 * global_const.OM + u0 / global_const.RE)
-                * global_array.sn[k] ** 2
-            )
-            global_array.u[j, k, :] = (
-                (global_array.ps[j, k] + global_const.PS0) * u0 * global_array.cs[k]
-            )
+    phis0 = const.G * 2000.0
+    flamc = 3.0 * const.pi / 2.0
+    phic = const.pi / 6.0
+    distm = const.pi / 9.0
+    inner = (slice(1, const.NJ + 1), slice(1, const.NK + 1))
+    flam, phi = _lonlat(state)
+    sn = array.sn[inner[1]]
+    cs = array.cs[inner[1]]
+    dist = np.sqrt((flam - flamc) ** 2 + (phi - phic) ** 2)
+    cone = np.where(dist < distm, 1.0 - dist / distm, 0.0)
+    array.phis[inner] = phis0 * cone
+    array.ps[inner] = (
+        -const.RHOS * array.phis[inner]
+        - const.RHOS * u0 * const.RE / 2.0 * (2.0 * const.OM + u0 / const.RE) * sn**2
+    )
+    psg = array.ps[inner] + const.PS0
+    array.u[inner] = (psg * u0 * cs)[..., np.newaxis]
     #
-    #     Vorgabe einer Temperaturanomalie
+    #     Vorgabe einer Temperaturanomalie (same cone as the mountain)
     #
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            dist = np.sqrt(
-                (global_array.flam[j] - flamc) ** 2
-                + (global_array.phi[k] - 1.0 * phic) ** 2
-            )
-            if dist < distm:
-                global_array.t[j, k, :] = 1.0 - dist / distm
-            else:
-                global_array.t[j, k, :] = 0.0
-            global_array.t[j, k, :] = (
-                global_array.ps[j, k] + global_const.PS0
-            ) * global_array.t[j, k, :]
+    array.t[inner] = (psg * cone.astype(array.t.dtype))[..., np.newaxis]
 
 
 # Case 3: Random wind field
-def random():
-    global_array.u[:] = (
-        np.random.uniform(
+@case(3)
+def random(state):
+    const = state.const
+    array = state.array
+    rng = np.random.default_rng(const.SEED)
+    array.u[:] = (
+        rng.uniform(
             low=-1.0,
             high=1.0,
-            size=(global_const.NJ + 2, global_const.NK + 2, global_const.NL),
+            size=(const.NJ + 2, const.NK + 2, const.NL),
         )
         * 30
-        * global_const.PS0
+        * const.PS0
     )
-    global_array.v[:] = (
-        np.random.uniform(
+    array.v[:] = (
+        rng.uniform(
             low=-1.0,
             high=1.0,
-            size=(global_const.NJ + 2, global_const.NK + 2, global_const.NL),
+            size=(const.NJ + 2, const.NK + 2, const.NL),
         )
         * 30
-        * global_const.PS0
+        * const.PS0
     )
 
 
 #
 # initialize case according to selection
 #
-def init_case():
-    if global_const.IEXP == 1:
-        low_pressure_system()
-    elif global_const.IEXP == 2:
-        montain_flow()
-    elif global_const.IEXP == 3:
-        random()
-    else:
-        print("Experiment number not defined.")
+def init_case(state):
+    const = state.const
+    if state.members is not None:
+        for member in state.member_states():
+            init_case(member)
+        return
+    if const.IEXP not in CASES:
+        progress.logger.warning("Experiment number not defined.")
+        return
+    CASES[const.IEXP](state)
 
 
 ###############################################
 
 
 if __name__ == "__main__":
-    import grid
+    from .variables import ModelState
+    from . import grid
 
-    grid.grid()
-    init_case()
+    state = ModelState()
+    grid.grid(state)
+    init_case(state)
@@ -1,32 +1,150 @@
-from .constants import global_const
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import time
+
+from .constants import GLOBAL_CONST, global_const
+from .variables import ModelState
 from . import globagrim
 from . import visualization
 
+_output_path = global_const.output_path  # output of the latest run
+
+
+def _profile_path(profile):
+    # PROFILE=True writes profile.json, a string is used as path
+    if profile is True:
+        return "profile.json"
+    return profile or None
+
+
+def _configuration(kwargs):
+    return GLOBAL_CONST(
+        IEXP=kwargs.get("IEXP", global_const.IEXP),
+        NJ=kwargs.get("NJ", global_const.NJ),
+        NK=kwargs.get("NK", global_const.NK),
+        NL=kwargs.get("NL", global_const.NL),
+        DT=kwargs.get("DT", global_const.DT),
+        TF=kwargs.get("TF", global_const.TF),
+        BACKEND=kwargs.get("BACKEND", global_const.BACKEND),
+        NTHREADS=kwargs.get("NTHREADS", global_const.NTHREADS),
+        SEED=kwargs.get("SEED", global_const.SEED),
+        DTYPE=kwargs.get("DTYPE", global_const.DTYPE),
+        ACC64=kwargs.get("ACC64", global_const.ACC64),
+        LEAN=kwargs.get("LEAN", global_const.LEAN),
+        LAYOUT=kwargs.get("LAYOUT", global_const.LAYOUT),
+        SCHEME=kwargs.get("SCHEME", global_const.SCHEME),
+        ASSELIN=kwargs.get("ASSELIN", global_const.ASSELIN),
+        WILLIAMS=kwargs.get("WILLIAMS", global_const.WILLIAMS),
+        CFL=kwargs.get("CFL", global_const.CFL),
+        CFL_INT=kwargs.get("CFL_INT", global_const.CFL_INT),
+        POLAR=kwargs.get("POLAR", global_const.POLAR),
+        output_int=kwargs.get("INT", 0),
+        output_buffer=kwargs.get("BUF", global_const.output_buffer),
+        output_queue=kwargs.get("QUEUE", global_const.output_queue),
+        output_vars=tuple(kwargs.get("VARS", global_const.output_vars)),
+        output_zlib=kwargs.get("ZLIB", global_const.output_zlib),
+        output_complevel=kwargs.get("COMPLEVEL", global_const.output_complevel),
+        output_shuffle=kwargs.get("SHUFFLE", global_const.output_shuffle),
+        output_lsd=kwargs.get("LSD", global_const.output_lsd),
+        output_chunks=kwargs.get("CHUNKS", global_const.output_chunks),
+        output_path=kwargs.get("OUT", global_const.output_path),
+        verbosity=kwargs.get("VERBOSE", global_const.verbosity),
+        report_int=kwargs.get("REPORT", global_const.report_int),
+        profile_path=_profile_path(kwargs.get("PROFILE", False)),
+        restart_int=kwargs.get("RINT", global_const.restart_int),
+        restart_path=kwargs.get("ROUT", global_const.restart_path),
+        restart_file=kwargs.get("RESTART", global_const.restart_file),
+    )
+
 
 def run(**kwargs):
+    global _output_path
+
+    state = ModelState(_configuration(kwargs))
+
+    globagrim.globagrim(state)
+
+    _output_path = state.const.output_path
+    return state
+
+
+def ensemble(**kwargs):
+    #
+    # integrate MEMBERS model runs of the same configuration together, member
+    # m starts with the random seed SEED + m (or an unseeded generator)
+    #
+    global _output_path
+
+    state = ModelState(_configuration(kwargs), members=kwargs.get("MEMBERS", 2))
+
+    globagrim.globagrim(state)
+
+    _output_path = state.const.output_path
+    return state
+
 
-    global_const.IEXP = kwargs.get("IEXP", global_const.IEXP)
+def _sweep_run(config):
+    #
+    # run one configuration of a sweep in a worker process
+    #
+    record = {"config": config, "output": config["OUT"]}
+    start = time.perf_counter()
+    try:
+        state = run(**config)
+    except Exception as error:
+        record["status"] = "failed"
+        record["error"] = repr(error)
+        record["wall_time"] = time.perf_counter() - start
+        return record
+    wall_time = time.perf_counter() - start
+    steps = state.scalar.nsteps
+    record["status"] = "ok"
+    record["wall_time"] = wall_time
+    record["steps"] = steps
+    record["steps_per_second"] = steps / wall_time
+    record["simulated_hours_per_wall_hour"] = state.scalar.ti / wall_time
+    return record
 
-    global_const.NJ = kwargs.get("NJ", global_const.NJ)
-    global_const.NK = kwargs.get("NK", global_const.NK)
-    global_const.NL = kwargs.get("NL", global_const.NL)
 
-    global_const.DT = kwargs.get("DT", global_const.DT)
-    global_const.TF = kwargs.get("TF", global_const.TF)
+def sweep(configurations, **kwargs):
+    #
+    # run a list of configurations (keyword arguments of run) in at most
+    # PROCESSES worker processes, every configuration writes its own output
+    # file to DIR and a manifest.json summarizes all runs
+    #
+    directory = kwargs.get("DIR", "sweep")
+    processes = kwargs.get("PROCESSES", os.cpu_count())
 
-    global_const.output_int = kwargs.get("INT", 0) 
+    os.makedirs(directory, exist_ok=True)
+    jobs = []
+    for n, config in enumerate(configurations):
+        config = dict(config)
+        config.setdefault("OUT", os.path.join(directory, "run_%03d.nc" % n))
+        jobs.append(config)
 
-    global_const.output_path = kwargs.get("OUT", global_const.output_path)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        runs = list(pool.map(_sweep_run, jobs))
+    manifest = {
+        "processes": processes,
+        "wall_time": time.perf_counter() - start,
+        "runs": runs,
+    }
 
-    globagrim.globagrim()
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
 
 
 def plot(**kwargs):
 
+    path = kwargs.get("path", _output_path)
     var_name = kwargs.get("var_name", "PSG")
     time_step = kwargs.get("out_step", 0)
     center = kwargs.get("center", (-180.0, 0.0))
     min_max = kwargs.get("min_max", None)
     save = kwargs.get("save", None)
+    member = kwargs.get("member", 0)
 
-    visualization.plot(var_name, time_step, center, min_max, save)
+    visualization.plot(path, var_name, time_step, center, min_max, save, member)
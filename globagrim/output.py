@@ -3,52 +3,181 @@ import netCDF4
 from netCDF4 import Dataset
 from datetime import datetime
 import os
+import queue
+import threading
+
+from . import profiling
+from . import progress
+
+#
+# output variables: dimensions, units, long name and standard name
+#
+VARIABLES = {
+    "SE": (("lat", "lon"), "m", "Surface Elevation", None),
+    "PSG": (
+        ("time", "lat", "lon"),
+        "hPa",
+        "Sea Level Pressure",
+        "air_pressure_at_mean_sea_level",
+    ),
+    "T": (("time", "level", "lat", "lon"), "K", "Temperature", "air_temperature"),
+    "U": (("time", "level", "lat", "lon"), "m/s", "Zonal Wind", "eastward_wind"),
+    "V": (("time", "level", "lat", "lon"), "m/s", "Meridional Wind", "northward_wind"),
+    # "W": (("time", "level", "lat", "lon"), "1/s", "Vertical Speed", None),
+    # "GP": (("time", "level", "lat", "lon"), "J/kg", "Geopotential", "geopotential"),
+}
+
+
+def _output_steps(const):
+    # number of output time steps of a run, including the initial conditions
+    nt = int(const.TF * 3600 / const.DT + 0.5)
+    if const.output_int == 0:
+        return nt + 1
+    return int(nt / (const.output_int * 3600 / const.DT)) + 1
+
+
+TIME_CHUNK = 100  # largest number of output steps in a chunk of CHUNKS="time"
+
+
+def _chunk_cache(var):
+    #
+    # chunk cache of a variable holding all chunks of one row along time,
+    # each buffer flush then writes into the cached chunks and every chunk
+    # goes to the file (and is compressed) once instead of once per flush
+    #
+    chunks = var.chunking()
+    sizes = [len(dim) for dim in var.get_dims()[1:]]
+    row = chunks[0] * int(np.prod(sizes))  # values of one row
+    count = int(np.prod([-(-size // c) for size, c in zip(sizes, chunks[1:])]))
+    var.set_var_chunk_cache(
+        size=row * var.dtype.itemsize, nelems=_prime(10 * count + 1), preemption=0.0
+    )
 
-from .variables import global_const, global_str, global_int, global_array
 
+def _prime(n):
+    # smallest prime >= n, the number of hash slots of the chunk cache
+    while any(n % d == 0 for d in range(2, int(n**0.5) + 1)):
+        n += 1
+    return n
+
+
+def _chunks(state, dims):
+    #
+    # chunk shape of an output variable
+    #   None:  one chunk holds the frames of one buffer flush
+    #   "map": one chunk holds one horizontal field (one time step, member
+    #          and level), fast to read for maps
+    #   "time": one chunk holds up to TIME_CHUNK output steps of a tile of
+    #          8x16 grid points, fast to read for time series
+    #
+    const = state.const
+    if dims[0] != "time":
+        return None
+    size = {
+        "ensemble": state.members,
+        "level": const.NL,
+        "lat": const.NK,
+        "lon": const.NJ,
+    }
+    if const.output_chunks is None:
+        return [const.output_buffer] + [size[dim] for dim in dims[1:]]
+    if const.output_chunks == "map":
+        return [1] + [size[dim] if dim in ("lat", "lon") else 1 for dim in dims[1:]]
+    if const.output_chunks == "time":
+        tile = {"lat": min(const.NK, 8), "lon": min(const.NJ, 16)}
+        steps = min(_output_steps(const), TIME_CHUNK)
+        return [steps] + [tile.get(dim, 1) for dim in dims[1:]]
+    raise ValueError(
+        "unknown output chunk layout " + repr(const.output_chunks)
+        + " (None, \"map\" or \"time\")"
+    )
 
-# Later move to variables
-def init_output():
-    global out, PSG, SE, T, U, V, time
 
-    print("Init: ", os.path.join(os.getcwd(), global_const.output_path))
-    out = Dataset(global_const.output_path, "w")
+def _compression(const, name):
+    # zlib/shuffle compression and lossy quantization of a variable
+    lsd = const.output_lsd
+    if isinstance(lsd, dict):
+        lsd = lsd.get(name)
+    return dict(
+        zlib=const.output_zlib,
+        complevel=const.output_complevel,
+        shuffle=const.output_shuffle,
+        least_significant_digit=lsd,
+    )
 
-    level = out.createDimension("level", global_const.NL)
-    time = out.createDimension("time", None)  # unlimited
-    lon = out.createDimension("lon", global_const.NJ)
-    lat = out.createDimension("lat", global_const.NK)
 
-    # create variables
-    longitudes = out.createVariable("lon", "d", "lon", fill_value=False)
-    latitudes = out.createVariable("lat", "d", "lat", fill_value=False)
-    time = out.createVariable("time", "d", "time", fill_value=False)
+def init_output(state):
+    const = state.const
+    string = state.string
 
-    SE = out.createVariable("SE", "f", ("lat", "lon"), fill_value=netCDF4.default_fillvals['f4'])
+    progress.log(state, 1, "Init: %s", os.path.join(os.getcwd(), const.output_path))
+    time0 = (
+        datetime.strptime(string.start_time, "%d.%m.%Y %H:%M:%S")
+        - datetime.strptime("08.10.1992 15:15:42.5", "%d.%m.%Y %H:%M:%S.%f")
+    ).total_seconds()
+    if const.restart_file is not None and os.path.exists(const.output_path):
+        # continue the output of the restarted run after its last step
+        out = Dataset(const.output_path, "a")
+        start = state.scalar.ntout + 1
+    else:
+        out = _create_output(state)
+        start = 0
+    if const.output_chunks == "time":
+        for var in out.variables.values():
+            if var.ndim > 1 and var.dimensions[0] == "time":
+                _chunk_cache(var)
 
-    PSG = out.createVariable(
-        "PSG", "f", ("time", "lat", "lon"), fill_value=netCDF4.default_fillvals['f4']
-    )  # NetCDF has (level, time, lat, lon) as standard
+    state.out = out
+    state.out_buffer = OUTPUT_BUFFER(out, const.output_buffer, time0)
+    state.out_buffer.start = start
+    if const.output_queue > 0:
+        state.out_writer = OUTPUT_WRITER(state, const.output_queue)
 
-    T = out.createVariable(
-        "T", "f", ("time", "level", "lat", "lon"), fill_value=netCDF4.default_fillvals['f4']
-    )
 
-    U = out.createVariable(
-        "U", "f", ("time", "level", "lat", "lon"), fill_value=netCDF4.default_fillvals['f4']
-    )
+def _create_output(state):
+    const = state.const
+    array = state.array
 
-    V = out.createVariable(
-        "V", "f", ("time", "level", "lat", "lon"), fill_value=netCDF4.default_fillvals['f4']
-    )
+    out = Dataset(const.output_path, "w")
 
-    #    W = out.createVariable(
-    #        "W", "f", ("time", "level", "lat", "lon"), fill_value=netCDF4.default_fillvals['f4']
-    #    )
+    level = out.createDimension("level", const.NL)
+    time = out.createDimension("time", None)  # unlimited
+    lon = out.createDimension("lon", const.NJ)
+    lat = out.createDimension("lat", const.NK)
+    if state.members is None:
+        ensemble = ()
+    else:
+        out.createDimension("ensemble", state.members)
+        ensemble = ("ensemble",)
 
-    #    GP = out.createVariable(
-    #        "GP", "f", ("time", "level", "lat", "lon"), fill_value=netCDF4.default_fillvals['f4']
-    #    )
+    # create variables
+    longitudes = out.createVariable("lon", "d", "lon", fill_value=False)
+    latitudes = out.createVariable("lat", "d", "lat", fill_value=False)
+    time = out.createVariable("time", "d", "time", fill_value=False)
+    if state.members is not None:
+        members = out.createVariable("ensemble", "i4", "ensemble", fill_value=False)
+        members.long_name = "ensemble member"
+        members[:] = np.arange(state.members)
+
+    for name in const.output_vars:
+        if name not in VARIABLES:
+            raise ValueError(
+                "unknown output variable " + repr(name) + " " + str(list(VARIABLES))
+            )
+        dims, units, long_name, standard_name = VARIABLES[name]
+        dims = dims[:1] + ensemble + dims[1:] if dims[0] == "time" else ensemble + dims
+        var = out.createVariable(
+            name,
+            "f",
+            dims,
+            fill_value=netCDF4.default_fillvals['f4'],
+            chunksizes=_chunks(state, dims),
+            **_compression(const, name),
+        )  # NetCDF has (level, time, lat, lon) as standard
+        var.units = units
+        var.long_name = long_name
+        if standard_name is not None:
+            var.standard_name = standard_name
 
     # set axis attriute
     longitudes.axis = "X"
@@ -61,48 +190,19 @@ def init_output():
     latitudes.units = "degrees_north"
     time.units = "seconds since 1992-10-8 15:15:42.5"  # Coordinated Universal Time
 
-    SE.units = "m"
-    PSG.units = "hPa"
-    T.units = "K"
-    U.units = "m/s"
-    V.units = "m/s"
-    #    W.units = "1/s"
-    #    GP.units = "J/kg"
-
     # assign long names
     longitudes.long_name = 'longitude'
     latitudes.long_name = 'latitude'
     time.long_name = 'time'
 
-    SE.long_name = "Surface Elevation"
-    PSG.long_name = "Sea Level Pressure"
-    T.long_name = "Temperature"
-    U.long_name = "Zonal Wind"
-    V.long_name = "Meridional Wind"
-    #    W.long_name = "Vertical Speed"
-    #    GP.long_name = "Geopotential"
-
     # assign standard names
     longitudes.standard_name = 'longitude'
     latitudes.standard_name = 'latitude'
     time.standard_name = 'time'
 
-    # SE.standard_name = None
-    PSG.standard_name = "air_pressure_at_mean_sea_level"
-    T.standard_name = "air_temperature"
-    U.standard_name = "eastward_wind"
-    V.standard_name = "northward_wind"
-    #    W.standard_name = None
-    #    GP.standard_name = "geopotential"
-
     # fill lon/lat
-    longitudes[:] = global_array.flam_deg[1 : global_const.NJ + 1]
-    latitudes[:] = global_array.phi_deg[1 : global_const.NK + 1]
-
-    time[0] = (
-        datetime.strptime(global_str.start_time, "%d.%m.%Y %H:%M:%S")
-        - datetime.strptime("08.10.1992 15:15:42.5", "%d.%m.%Y %H:%M:%S.%f")
-    ).total_seconds()
+    longitudes[:] = array.flam_deg[1 : const.NJ + 1]
+    latitudes[:] = array.phi_deg[1 : const.NK + 1]
 
     new_glob_attrs = {
         'title': "GLOBAGRIM simulation",
@@ -127,86 +227,183 @@ def init_output():
     # `geospatial_lon_resolution` if the lat and lon steps are fixed in space.
 
     out.setncatts(new_glob_attrs)
+    return out
+
+
+class OUTPUT_BUFFER:
+    #
+    # float32 frames of the output steps not yet written to the file, in the
+    # dimension order of the netCDF variables
+    #
+    def __init__(self, out, size, time0):
+        self.size = size  # number of frames written at once
+        self.time0 = time0  # time of the initial conditions
+        self.start = 0  # output step of the first buffered frame
+        self.count = 0  # number of buffered frames
+        self.frames = {
+            name: np.empty((size,) + out[name].shape[1:], dtype="f4")
+            for name in ("PSG", "T", "U", "V")
+            if name in out.variables
+        }
+        self.frames["time"] = np.empty(size, dtype="d")
+
+
+def fill_output(state):
+    const = state.const
+    array = state.array
+    scalar = state.scalar
+
+    if scalar.ntout == 0:
+        progress.log(state, 1, "Write initial conditions to output.")
+    else:
+        progress.log(state, 2, "Write to output step %d", scalar.ntout, ntout=scalar.ntout)
+
+    #
+    # copy of the interior fields, the time loop overwrites the arrays
+    # while the writer thread converts and writes the copy
+    #
+    surface = (Ellipsis, slice(1, const.NJ + 1), slice(1, const.NK + 1))
+    interior = surface + (slice(None),)
+    snapshot = {"ti": scalar.ti}
+    for name, field, index in (
+        ("SE", "phis", surface),
+        ("PSG", "psg", surface),
+        ("T", "tw", interior),
+        ("U", "uw", interior),
+        ("V", "vw", interior),
+    ):
+        if name in const.output_vars and (name != "SE" or scalar.ntout == 0):
+            # in the memory order of the layout
+            snapshot[field] = getattr(array, field)[index].copy(order="K")
+    if state.out_writer is None:
+        profiling.call(state, write_snapshot, state, snapshot)
+    else:
+        state.out_writer.put(snapshot)
 
 
-def fill_output():
-    #    global PSG, U, V
+def write_snapshot(state, snapshot):
+    const = state.const
+    buffer = state.out_buffer
 
-    if global_int.ntout == 0:
-        print("Write initial conditions to output.")
-        SE[:, :] = (
-            np.swapaxes(
-                global_array.phis[1 : global_const.NJ + 1, 1 : global_const.NK + 1],
-                0,
-                1,
-            )
-            / global_const.G
+    if "phis" in snapshot:
+        state.out["SE"][...] = (
+            np.swapaxes(snapshot["phis"], -2, -1) / const.G
         )  # NetCDF has (level, time, lat, lon) as standard
-    else:
-        print("Write to output")
-    
-    time[global_int.ntout] = global_int.ti + time[0]
 
-    PSG[global_int.ntout, :, :] = (
-        np.swapaxes(
-            global_array.psg[1 : global_const.NJ + 1, 1 : global_const.NK + 1], 0, 1
+    #
+    # convert into the next buffer frame, the arrays in (lon, lat, level)
+    # order are transposed to (level, lat, lon)
+    #
+    n = buffer.count
+    frames = buffer.frames
+    frames["time"][n] = snapshot["ti"] + buffer.time0
+    if "psg" in snapshot:
+        np.divide(np.swapaxes(snapshot["psg"], -2, -1), 100, out=frames["PSG"][n])
+    if "tw" in snapshot:
+        np.add(
+            np.moveaxis(snapshot["tw"], [-3, -2, -1], [-1, -2, -3]),
+            const.T0,
+            out=frames["T"][n],
         )
-        / 100
-    )
-
-    T[global_int.ntout, :, :, :] = (
-        np.moveaxis(
-            global_array.tw[1 : global_const.NJ + 1, 1 : global_const.NK + 1, :],
-            [0, 1, 2],
-            [2, 1, 0],
+    if "uw" in snapshot:
+        frames["U"][n] = np.moveaxis(snapshot["uw"], [-3, -2, -1], [-1, -2, -3])
+    if "vw" in snapshot:
+        frames["V"][n] = np.moveaxis(snapshot["vw"], [-3, -2, -1], [-1, -2, -3])
+    buffer.count += 1
+    if buffer.count == buffer.size:
+        flush_output(state)
+
+
+def flush_output(state):
+    #
+    # write the buffered frames with one hyperslab write per variable
+    #
+    buffer = state.out_buffer
+    if buffer.count == 0:
+        return
+    steps = slice(buffer.start, buffer.start + buffer.count)
+    for name, frames in buffer.frames.items():
+        state.out[name][steps] = frames[: buffer.count]
+    buffer.start += buffer.count
+    buffer.count = 0
+
+
+class OUTPUT_WRITER:
+    #
+    # background thread writing the snapshots of fill_output, put() blocks
+    # while the queue is full so the time loop cannot run ahead of the disk
+    #
+    def __init__(self, state, size):
+        self.state = state
+        self.queue = queue.Queue(maxsize=size)
+        self.error = None  # exception raised in the writer thread
+        self.thread = threading.Thread(
+            target=self._work, name="globagrim-output", daemon=True
         )
-        + global_const.T0
-    )  # NetCDF has (level, time, lat, lon) as standard
-
-    U[global_int.ntout, :, :, :] = np.moveaxis(
-        global_array.uw[1 : global_const.NJ + 1, 1 : global_const.NK + 1, :],
-        [0, 1, 2],
-        [2, 1, 0],
-    )  # NetCDF has (level, time, lat, lon) as standard
-
-    V[global_int.ntout, :, :, :] = np.moveaxis(
-        global_array.vw[1 : global_const.NJ + 1, 1 : global_const.NK + 1, :],
-        [0, 1, 2],
-        [2, 1, 0],
-    )  # NetCDF has (level, time, lat, lon) as standard
-
-    # W[global_int.ntout, :, :, :] = np.moveaxis(
-    #     global_array.??[1 : global_const.NJ + 1, 1 : global_const.NK + 1, :],
-    #     [0, 1, 2],
-    #     [2, 1, 0],
-    # )  # NetCDF has (level, time, lat, lon) as standard
-
-    # GP[global_int.ntout, :, :, :] = np.moveaxis(
-    #     global_array.??[1 : global_const.NJ + 1, 1 : global_const.NK + 1, :],
-    #     [0, 1, 2],
-    #     [2, 1, 0],
-    # )  # NetCDF has (level, time, lat, lon) as standard
-
-
-def close():
-    global out
-    # close output and write to file
-    out.close()
+        self.thread.start()
+
+    def _work(self):
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                return
+            if self.error is None:
+                try:
+                    profiling.call(self.state, write_snapshot, self.state, snapshot)
+                except Exception as error:
+                    self.error = error
+            self.queue.task_done()
+
+    def _check(self):
+        if self.error is not None:
+            raise RuntimeError("output writer failed") from self.error
+
+    def put(self, snapshot):
+        self._check()
+        self.queue.put(snapshot)
+
+    def drain(self):
+        # wait until all queued snapshots are written
+        self.queue.join()
+        self._check()
+
+    def close(self):
+        # write all queued snapshots and stop the thread
+        self.queue.put(None)
+        self.thread.join()
+        self._check()
+
+
+def sync(state):
+    # write all output steps so far to the file on disk
+    if state.out_writer is not None:
+        state.out_writer.drain()
+    flush_output(state)
+    state.out.sync()
+
+
+def close(state):
+    # drain the writer, write remaining frames, close output and write to file
+    if state.out is None:
+        return
+    try:
+        if state.out_writer is not None:
+            writer, state.out_writer = state.out_writer, None
+            writer.close()
+        flush_output(state)
+    finally:
+        out, state.out = state.out, None
+        out.close()
 
 
 if __name__ == "__main__":
-    import grid
-
-    grid.grid()
-
-    import init
-
-    init.init_case()
-
-    import boundary_conditions
-
-    boundary_conditions.boundary_conditions()
-
-    init_output()
-    fill_output()
-    close()
+    from .variables import ModelState
+    from . import grid, init, boundary_conditions
+
+    state = ModelState()
+    grid.grid(state)
+    init.init_case(state)
+    boundary_conditions.boundary_conditions(state)
+    init_output(state)
+    fill_output(state)
+    close(state)
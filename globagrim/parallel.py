@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import os
+import numpy as np
+
+#
+# latitude band decomposition of the model grid for multi-threaded kernels
+#
+
+_LATITUDE = (
+    "phi_deg",
+    "phi",
+    "dx",
+    "cs",
+    "sn",
+    "f",
+    "rdx2",
+    "rdx4",
+    "rcsdy2",
+    "fcen",
+)  # 1D arrays along latitude
+
+_executors = {}  # thread pools by number of threads
+
+
+def _forget_executors():
+    # the threads of the pools do not exist in a forked child process (e.g.
+    # a worker of model.sweep), the child starts its own pools
+    _executors.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_executors)
+
+
+def bands(k0, k1, n):
+    #
+    # split the latitudes k0 <= k < k1 into at most n contiguous bands
+    #
+    edges = np.linspace(k0, k1, min(n, k1 - k0) + 1).round().astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def band_state(state, k0, k1):
+    #
+    # view of the model state on the latitudes k0 <= k < k1, all arrays share
+    # their memory with the full state
+    #
+    band = copy.copy(state)
+    band.array = copy.copy(state.array)
+    lead = 0 if state.members is None else 1  # ensemble dimension
+    for name, value in vars(state.array).items():
+        if not isinstance(value, np.ndarray):
+            continue
+        if value.ndim >= 2:
+            setattr(
+                band.array, name, value[(slice(None),) * (lead + 1) + (slice(k0, k1),)]
+            )
+        elif name in _LATITUDE:
+            setattr(band.array, name, value[k0:k1])
+    return band
+
+
+def run(function, bands, nthreads):
+    #
+    # call function(k0, k1) for all bands, concurrently if nthreads > 1, and
+    # wait until all of them are finished
+    #
+    if nthreads <= 1:
+        for k0, k1 in bands:
+            function(k0, k1)
+        return
+    if nthreads not in _executors:
+        _executors[nthreads] = ThreadPoolExecutor(max_workers=nthreads)
+    futures = [_executors[nthreads].submit(function, k0, k1) for k0, k1 in bands]
+    for future in futures:
+        future.result()
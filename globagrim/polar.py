@@ -0,0 +1,51 @@
+import numpy as np
+
+#
+# polar Fourier filter (POLAR): the trends on the latitudes poleward of
+# POLAR degrees are damped per zonal wave number m by
+#
+#   S(m) = min(1, cos(phi) / (cos(POLAR) |sin(2 pi m / NJ)|)),
+#
+# the inverse of the grid width at phi over the one at POLAR seen by the
+# centered zonal differences. The filtered waves move no faster than on the
+# latitude POLAR, such that DT is limited by the grid width there instead
+# of the short zonal grid distances next to the poles.
+#
+
+
+def factors(state):
+    #
+    # latitude rows poleward of POLAR and their damping factors
+    # (wave number, row), computed by grid.grid into state.polar
+    #
+    const = state.const
+    array = state.array
+    NJ = const.NJ
+    NK = const.NK
+    rows = np.flatnonzero(np.abs(array.phi_deg[1 : NK + 1]) > const.POLAR) + 1
+    wave = np.abs(np.sin(2.0 * np.pi * np.arange(NJ // 2 + 1) / NJ))
+    ratio = np.cos(array.phi[rows]) / np.cos(np.radians(const.POLAR))
+    with np.errstate(divide="ignore"):
+        return rows, np.minimum(1.0, ratio / wave[:, None])
+
+
+def filter_trends(state):
+    #
+    # Fourier filter of the trends along the latitude rows poleward of
+    # POLAR, in place
+    #
+    array = state.array
+    NJ = state.const.NJ
+    rows, factor = state.polar
+    surface = (Ellipsis, slice(1, NJ + 1), rows)
+    field = surface + (slice(None),)
+    for trend, index, damping in (
+        (array.pst, surface, factor),
+        (array.ut, field, factor[..., None]),
+        (array.vt, field, factor[..., None]),
+        (array.tt, field, factor[..., None]),
+    ):
+        # the longitudes are the axis of the wave numbers of damping
+        modes = np.fft.rfft(trend[index], axis=-damping.ndim)
+        modes *= damping
+        trend[index] = np.fft.irfft(modes, n=NJ, axis=-damping.ndim)
@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+
+#
+# wall time and number of calls of the model kernels, recorded with
+# call(state, ...) while state.profile is set (model.run(PROFILE=True))
+#
+
+
+class PROFILE:
+    def __init__(self):
+        self.time = {}  # cumulative wall time in seconds per kernel
+        self.calls = {}  # number of calls per kernel
+        self.wall_time = None  # wall time of the whole run
+        self._lock = threading.Lock()  # kernels run in several threads
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.time[name] = self.time.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def records(self):
+        # one record per kernel, the most expensive first
+        return [
+            {
+                "kernel": name,
+                "calls": self.calls[name],
+                "time": seconds,
+                "time_per_call": seconds / self.calls[name],
+            }
+            for name, seconds in sorted(
+                self.time.items(), key=lambda item: item[1], reverse=True
+            )
+        ]
+
+    def report(self):
+        #
+        # table of the kernels, times of kernels running in latitude bands
+        # are summed over the threads
+        #
+        lines = [
+            "%-36s %8s %12s %12s %7s"
+            % ("kernel", "calls", "total [s]", "per call [ms]", "run [%]")
+        ]
+        for record in self.records():
+            share = (
+                100.0 * record["time"] / self.wall_time if self.wall_time else 0.0
+            )
+            lines.append(
+                "%-36s %8d %12.4f %12.4f %7.1f"
+                % (
+                    record["kernel"],
+                    record["calls"],
+                    record["time"],
+                    1000.0 * record["time_per_call"],
+                    share,
+                )
+            )
+        if self.wall_time is not None:
+            lines.append("%-36s %8s %12.4f" % ("run", "", self.wall_time))
+        return "\n".join(lines)
+
+    def write_json(self, path, **info):
+        # machine readable profile, info is added to the top level
+        with open(path, "w") as f:
+            json.dump(
+                dict(info, wall_time=self.wall_time, kernels=self.records()),
+                f,
+                indent=2,
+            )
+
+
+def call(state, function, *args, name=None, **kwargs):
+    # function(*args, **kwargs), timed under name if the run is profiled
+    profile = state.profile
+    if profile is None:
+        return function(*args, **kwargs)
+    start = time.perf_counter()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        profile.add(function.__name__ if name is None else name, seconds)
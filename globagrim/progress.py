@@ -0,0 +1,110 @@
+import logging
+import time
+
+#
+# run messages and progress of the time loop, sent to the "globagrim" logger
+#   verbosity 0: warnings only
+#   verbosity 1: run information and progress every const.report_int seconds
+#   verbosity 2: additionally every time step and output step (DEBUG)
+#
+logger = logging.getLogger("globagrim")
+_handler = None  # console handler of _default_handler
+
+
+def _default_handler(verbosity):
+    #
+    # without any logging configuration the messages go to the console like
+    # the former print output, at the level of the verbosity of each run
+    #
+    global _handler
+    if _handler is None:
+        if logger.handlers or logging.getLogger().handlers:
+            return
+        _handler = logging.StreamHandler()
+        _handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(_handler)
+    if _handler in logger.handlers:
+        logger.setLevel(logging.DEBUG if verbosity >= 2 else logging.INFO)
+
+
+def log(state, verbosity, message, *args, **extra):
+    # message of the given verbosity, INFO for 1 and DEBUG for 2
+    if state.const.verbosity < verbosity:
+        return
+    _default_handler(state.const.verbosity)
+    level = logging.INFO if verbosity <= 1 else logging.DEBUG
+    logger.log(level, message, *args, extra=extra)
+
+
+class PROGRESS:
+    #
+    # throttled progress of the time steps n0 < n < nt with steps per second,
+    # simulated hours per wall-clock hour and estimated time to completion
+    #
+    def __init__(self, state, n0, nt):
+        self.state = state
+        self.n0 = n0  # last time step done before the time loop
+        self.nt = nt  # number of time steps
+        self.start = time.perf_counter()
+        self.last = self.start  # time of the last progress record
+
+    def _rates(self, n, now):
+        const = self.state.const
+        wall = now - self.start
+        steps = n - self.n0
+        steps_per_second = steps / wall if wall > 0 else float("inf")
+        return dict(
+            step=n,
+            steps=self.nt,
+            wall_time=wall,
+            steps_per_second=steps_per_second,
+            simulated_hours_per_wall_hour=steps_per_second * const.DT,
+            eta=(self.nt - 1 - n) / steps_per_second,
+        )
+
+    def step(self, n):
+        # called after time step n
+        const = self.state.const
+        if const.verbosity < 1:
+            return
+        if const.verbosity >= 2:
+            log(
+                self.state,
+                2,
+                "Model time step: %d, Time: %g minutes",
+                n,
+                self.state.scalar.ti / 60,
+                step=n,
+            )
+        now = time.perf_counter()
+        if now - self.last < const.report_int and n < self.nt - 1:
+            return
+        self.last = now
+        rates = self._rates(n, now)
+        log(
+            self.state,
+            1,
+            "step %d/%d (%.0f%%), %.1f steps/s, %.0f simulated hours per wall hour,"
+            " ETA %.0f s",
+            n + 1,
+            self.nt,
+            100.0 * (n + 1) / self.nt,
+            rates["steps_per_second"],
+            rates["simulated_hours_per_wall_hour"],
+            rates["eta"],
+            **rates
+        )
+
+    def finish(self):
+        const = self.state.const
+        wall = time.perf_counter() - self.start
+        log(
+            self.state,
+            1,
+            "Finished %d time steps in %.2f s",
+            self.nt - 1 - self.n0,
+            wall,
+            steps=self.nt,
+            wall_time=wall,
+            simulated_hours=self.state.scalar.ti / 3600,
+        )
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+
+#
+# restart files: the complete leapfrog state (current and past time level,
+# orography, model time, output step and a pending Euler step of an adaptive
+# time step) of a run as one .npz file
+#
+FIELDS = ["ps", "u", "v", "t", "psa", "ua", "va", "ta", "phis"]
+
+
+def write_restart(state, step, euler=False):
+    #
+    # checkpoint after time step `step`, euler if the next time step is an
+    # Euler step after a change of DT, written to a temporary file first
+    # so that a run killed while writing keeps the previous checkpoint
+    #
+    const = state.const
+    array = state.array
+    scalar = state.scalar
+    path = const.restart_path
+    with open(path + ".tmp", "wb") as f:
+        np.savez(
+            f,
+            NJ=const.NJ,
+            NK=const.NK,
+            NL=const.NL,
+            DT=const.DT,
+            members=-1 if state.members is None else state.members,
+            step=step,
+            euler=euler,
+            ti=scalar.ti,
+            ntout=scalar.ntout,
+            **{name: getattr(array, name) for name in FIELDS}
+        )
+    os.replace(path + ".tmp", path)
+
+
+def read_restart(state):
+    #
+    # load the checkpoint const.restart_file into the state and return the
+    # last completed time step and whether the next one is an Euler step
+    #
+    const = state.const
+    array = state.array
+    scalar = state.scalar
+    with np.load(const.restart_file) as data:
+        members = None if data["members"] < 0 else int(data["members"])
+        saved = (int(data["NJ"]), int(data["NK"]), int(data["NL"]), members)
+        if saved != (const.NJ, const.NK, const.NL, state.members):
+            raise ValueError(
+                "restart file " + str(const.restart_file)
+                + " has (NJ, NK, NL, members) = " + str(saved)
+            )
+        if float(data["DT"]) != const.DT:
+            if const.CFL is None:
+                raise ValueError(
+                    "restart file " + str(const.restart_file)
+                    + " has DT = " + str(float(data["DT"]))
+                )
+            const.DT = float(data["DT"])  # adaptive time step of the checkpoint
+        for name in FIELDS:
+            getattr(array, name)[...] = data[name]
+        scalar.ti = float(data["ti"])
+        scalar.ntout = int(data["ntout"])
+        euler = bool(data["euler"]) if "euler" in data else False
+        return int(data["step"]), euler
@@ -0,0 +1,288 @@
+import numpy as np
+
+from .indices import field, metric
+
+#
+# semi-implicit leapfrog (SCHEME="semi-implicit")
+#
+# The gravity wave terms linearized around the resting atmosphere with
+# temperature T0 and surface pressure PS0, i.e. the pressure gradient force
+# (apx, apy) and the divergence d with the mass flow dm in the surface
+# pressure trend and the compression heating, are averaged over the time
+# levels n-1 and n+1, all other terms stay explicit:
+#
+#   X(n+1) = X(n-1) + 2 DT (trend(X(n)) - L X(n)) + 2 DT L (X(n+1) + X(n-1)) / 2
+#
+# With P = RD T0 ps + H t (H: hydrostatic sum of the geopotential) this
+# gives one Helmholtz equation per vertical eigenmode of the level coupling
+# M = RD T0 1 b^T + FKAP T0 H A (b: mass flow, A: compression heating),
+#
+#   (1 - DT^2 lambda_n lap) P_n = Q_n,
+#
+# solved with a Fourier transform along the latitude circles and a
+# pentadiagonal solver along the meridians, which include the polar
+# boundary conditions. The time step is then only limited by advection
+# and no longer by the gravity waves on the short zonal grid distances
+# near the poles.
+#
+
+
+def vertical_operators(state):
+    #
+    # level coupling of the linearized trends: geopotential gp = H tw,
+    # surface pressure trend -b.d and compression heating -FKAP T0 A d with
+    # the level quirks of trend.py (dm of level 0 is 0, level 0 uses the
+    # divergence of level 1)
+    #
+    const = state.const
+    array = state.array
+    NL = const.NL
+    rdalp = array.rdalp.astype(np.float64)
+    H = np.zeros((NL, NL))
+    H[NL - 1, NL - 1] = rdalp[NL - 1]
+    for l in range(NL - 2, -1, -1):
+        H[l] = H[l + 1]
+        H[l, l] += rdalp[l]
+        H[l, l + 1] += rdalp[l]
+    dsig = state.scalar.dsig
+    A = np.zeros((NL, NL))
+    A[0, 1] = array.alp[1]
+    for l in range(1, NL):
+        A[l, l] = array.alp[l]
+        A[l, 1:l] += array.ralps[l] * dsig
+    b = np.zeros(NL)
+    b[1:] = dsig
+    M = const.RD * const.T0 * np.outer(np.ones(NL), b) + const.FKAP * const.T0 * H @ A
+    return H, A, b, M
+
+
+def _meridional_operator(state, omega):
+    #
+    # meridional part of the horizontal Laplacian (divergence of the
+    # pressure gradient) of one zonal wave number along k = 1..NK. omega is
+    # the phase of the wave at the opposite longitude, the polar halo points
+    # are P[0] = omega P[1] and v[0] = -omega v[1] as in boundary_conditions
+    #
+    array = state.array
+    NK = state.const.NK
+    unit = np.eye(NK, dtype=np.result_type(omega, np.float64))
+    p = np.concatenate([omega * unit[:1], unit, omega * unit[-1:]])
+    v = (p[2:] - p[:-2]) * array.rdy2
+    v = np.concatenate([-omega * v[:1], v, -omega * v[-1:]])
+    cs = array.cs.astype(np.float64)[:, None]
+    return (v[2:] * cs[2:] - v[:-2] * cs[:-2]) * array.rcsdy2[1:-1, None]
+
+
+def _bands(matrix):
+    # diagonals -2..2 of a pentadiagonal matrix, row i holds columns i-2..i+2
+    n = matrix.shape[-1]
+    bands = np.zeros(matrix.shape[:-2] + (n, 5), matrix.dtype)
+    for c in range(5):
+        offset = c - 2
+        diagonal = np.diagonal(matrix, offset, -2, -1)
+        if offset < 0:
+            bands[..., -offset:, c] = diagonal
+        else:
+            bands[..., : n - offset, c] = diagonal
+    return bands
+
+
+def _factor(bands):
+    #
+    # LU factorization without pivoting (the Helmholtz matrices are
+    # diagonally dominant) of pentadiagonal matrices given by their bands,
+    # vectorized over the leading dimensions: multipliers of the two rows
+    # below each pivot and the upper triangle (diagonal, +1, +2)
+    #
+    a = bands.copy()
+    n = a.shape[-2]
+    lower = np.zeros(a.shape[:-1] + (2,), a.dtype)
+    for k in range(n):
+        for r in (1, 2):
+            if k + r >= n:
+                break
+            f = a[..., k + r, 2 - r] / a[..., k, 2]
+            lower[..., k + r, r - 1] = f
+            for q in range(3):
+                if k + q < n and 2 - r + q <= 4:
+                    a[..., k + r, 2 - r + q] -= f * a[..., k, 2 + q]
+    return lower, a[..., 2:]
+
+
+def _solve(lower, upper, x):
+    # solution of the factorized systems for the right-hand sides x (last axis)
+    x = x.copy()
+    n = x.shape[-1]
+    for k in range(1, n):
+        x[..., k] -= lower[..., k, 0] * x[..., k - 1]
+        if k > 1:
+            x[..., k] -= lower[..., k, 1] * x[..., k - 2]
+    for k in range(n - 1, -1, -1):
+        if k + 1 < n:
+            x[..., k] -= upper[..., k, 1] * x[..., k + 1]
+        if k + 2 < n:
+            x[..., k] -= upper[..., k, 2] * x[..., k + 2]
+        x[..., k] /= upper[..., k, 0]
+    return x
+
+
+class SEMI_IMPLICIT:
+    #
+    # vertical eigenmodes and Fourier-space Laplacian of a model state,
+    # with the factorized Helmholtz matrices of the last time step DT
+    #
+    def __init__(self, state):
+        const = state.const
+        array = state.array
+        NJ = const.NJ
+        if NJ % 2:
+            raise ValueError("SCHEME='semi-implicit' needs an even NJ")
+        self.H, self.A, self.b, self.M = vertical_operators(state)
+        lam, E = np.linalg.eig(self.M)
+        self.lam = lam.real
+        self.E = E.real
+        self.Einv = np.linalg.inv(self.E)
+        #
+        # Laplacian of the zonal wave numbers m: zonal part on the diagonal,
+        # meridional part with the phase omega = (-1)^m of the opposite
+        # longitude in the polar halo points, linear and quadratic in omega
+        #
+        m = np.arange(NJ // 2 + 1)
+        omega = np.where(m % 2, -1.0, 1.0)
+        d0 = _meridional_operator(state, 0.0)
+        d_plus = _meridional_operator(state, 1.0)
+        d_minus = _meridional_operator(state, -1.0)
+        d1 = 0.5 * (d_plus - d_minus)
+        d2 = 0.5 * (d_plus + d_minus) - d0
+        zonal = -4.0 * np.sin(2.0 * np.pi * m / NJ) ** 2
+        rdx2 = array.rdx2.astype(np.float64)[1:-1]
+        self.lap = (
+            _bands(d0)
+            + omega[:, None, None] * _bands(d1)
+            + (omega**2)[:, None, None] * _bands(d2)
+        )
+        self.lap[..., 2] += zonal[:, None] * rdx2**2
+        self.dt = None
+
+    def helmholtz(self, dt):
+        # factorized (1 - dt^2 lambda_n lap_m) for all zonal wave numbers m
+        # and vertical modes n, (m, n, k, band)
+        if dt != self.dt:
+            bands = -(dt**2) * self.lam[:, None, None] * self.lap[:, None]
+            bands[..., 2] += 1.0
+            self.lower, self.upper = _factor(bands)
+            self.dt = dt
+        return self.lower, self.upper
+
+    def solve(self, q, dt):
+        # P of the Helmholtz equations for the right-hand side q (lon, lat, level)
+        lower, upper = self.helmholtz(dt)
+        modes = np.fft.rfft(q @ self.Einv.T, axis=-3)
+        modes = np.swapaxes(modes, -2, -1)  # (..., m, n, k)
+        modes = np.swapaxes(_solve(lower, upper, modes), -2, -1)
+        return np.fft.irfft(modes, n=q.shape[-3], axis=-3) @ self.E.T
+
+
+def _halo(state, a, sign):
+    #
+    # interior field (lon, lat, level) with the halo points of
+    # boundary_conditions (poles first, then east/west)
+    #
+    NJ = state.const.NJ
+    NK = state.const.NK
+    joppos = state.array.joppos
+    p = np.empty(a.shape[:-3] + (NJ + 2, NK + 2) + a.shape[-1:])
+    p[..., 1 : NJ + 1, 1 : NK + 1, :] = a
+    p[..., 0 : NJ + 1, 0, :] = sign * p[..., joppos, 1, :]
+    p[..., 0 : NJ + 1, NK + 1, :] = sign * p[..., joppos, NK, :]
+    p[..., 0, :, :] = p[..., NJ, :, :]
+    p[..., NJ + 1, :, :] = p[..., 1, :, :]
+    return p
+
+
+def _gradient(state, p):
+    # pressure gradient of the linearized trends, p with halo points
+    array = state.array
+    gx = (p[field(1, 0)] - p[field(-1, 0)]) * metric(array.rdx2)
+    gy = (p[field(0, 1)] - p[field(0, -1)]) * array.rdy2
+    return gx, gy
+
+
+def _divergence(state, u, v):
+    # divergence of mass-weighted wind as in trend.div_weighted_wind
+    array = state.array
+    return (u[field(1, 0)] - u[field(-1, 0)]) * metric(array.rdx2) + (
+        v[field(0, 1)] * metric(array.cs, 1) - v[field(0, -1)] * metric(array.cs, -1)
+    ) * metric(array.rcsdy2)
+
+
+def _pressure(state, solver, ps, t):
+    # P = RD T0 ps + H t
+    const = state.const
+    return const.RD * const.T0 * ps[..., None] + t @ solver.H.T
+
+
+def _column_trends(state, solver, d):
+    # linearized surface pressure and temperature trends of the divergence d
+    const = state.const
+    return -d @ solver.b, -const.FKAP * const.T0 * d @ solver.A.T
+
+
+def linear_trends(state, ps, u, v, t):
+    #
+    # linearized gravity wave trends L X of the fields with halo points,
+    # (ps, u, v, t) of the interior
+    #
+    solver = state.implicit
+    gx, gy = _gradient(state, _pressure(state, solver, ps, t))
+    pst, tt = _column_trends(state, solver, _divergence(state, u, v))
+    return pst, -gx, -gy, tt
+
+
+def time_step(state, ps, u, v, t, dt):
+    #
+    # future time level from the given level (ps, u, v, t) over dt with the
+    # current trends and the gravity wave terms averaged between the given
+    # and the future level: dt = 2 DT for the leapfrog steps, dt = DT for
+    # the first (Euler) step from the current level
+    #
+    array = state.array
+    if state.implicit is None:
+        state.implicit = SEMI_IMPLICIT(state)
+    solver = state.implicit
+    delta = 0.5 * dt
+    surface = (Ellipsis, slice(1, -1), slice(1, -1))
+    inner = field()
+    #
+    # explicit part Y = X(start) + delta (trend - L X(n))
+    #
+    current = linear_trends(state, array.ps, array.u, array.v, array.t)
+    start = (ps[surface], u[inner], v[inner], t[inner])
+    trends = (array.pst[surface], array.ut[inner], array.vt[inner], array.tt[inner])
+    y_ps, y_u, y_v, y_t = (
+        x + delta * (trend - linear) for x, trend, linear in zip(start, trends, current)
+    )
+    #
+    # Helmholtz equation of the averaged P, then the averaged winds,
+    # divergence, surface pressure and temperature
+    #
+    d = _divergence(state, _halo(state, y_u, -1), _halo(state, y_v, -1))
+    q = _pressure(state, solver, y_ps, y_t) - delta * d @ solver.M.T
+    gx, gy = _gradient(state, _halo(state, solver.solve(q, delta), 1))
+    mean_u = y_u - delta * gx
+    mean_v = y_v - delta * gy
+    d = _divergence(state, _halo(state, mean_u, -1), _halo(state, mean_v, -1))
+    pst, tt = _column_trends(state, solver, d)
+    mean = (y_ps + delta * pst, mean_u, mean_v, y_t + delta * tt)
+    #
+    # future level 2 mean - start, the halo points of the given level
+    #
+    for x, future, index, average in zip(
+        (ps, u, v, t),
+        (array.psn, array.un, array.vn, array.tn),
+        (surface, inner, inner, inner),
+        mean,
+    ):
+        result = 2.0 * average - x[index]
+        future[...] = x
+        future[index] = result
@@ -0,0 +1,123 @@
+import math
+
+import numpy as np
+
+from .indices import field, metric
+
+#
+# time filter and time step control of the leapfrog scheme
+#
+# Robert-Asselin-Williams filter (ASSELIN = nu, WILLIAMS = alpha): after each
+# leapfrog step the displacement d = nu/2 (X(n-1) - 2 X(n) + X(n+1)) damps
+# the computational mode of the leapfrog scheme,
+#
+#   X(n) += alpha d,   X(n+1) -= (1 - alpha) d,
+#
+# alpha = 1 is the classical Robert-Asselin filter, alpha = 0.53 nearly
+# keeps the mean of the three levels and with it the accuracy (Williams).
+#
+# Adaptive time step (CFL): every CFL_INT time steps the largest Courant
+# number of the advection plus the fastest explicit gravity wave on the
+# zonal and meridional grid distances is compared with the target CFL.
+# DT shrinks at once when the target is exceeded and grows by at most
+# GROWTH when the Courant number stays well below it, such that the
+# remaining integration time is a whole number of time steps. The leapfrog
+# scheme restarts with an Euler step after every change of DT.
+#
+GROWTH = 1.5  # largest growth of DT per check
+SLACK = 1.1  # least growth of DT worth a restart of the leapfrog scheme
+
+
+def asselin_filter(state):
+    #
+    # filter of the current level with the past and the future level after
+    # a leapfrog step, before advance_time_levels
+    #
+    const = state.const
+    array = state.array
+    for past, current, future in (
+        (array.psa, array.ps, array.psn),
+        (array.ua, array.u, array.un),
+        (array.va, array.v, array.vn),
+        (array.ta, array.t, array.tn),
+    ):
+        d = past + future
+        d -= 2.0 * current
+        d *= 0.5 * const.ASSELIN
+        current += const.WILLIAMS * d
+        if const.WILLIAMS != 1.0:
+            future -= (1.0 - const.WILLIAMS) * d
+
+
+def gravity_wave_speed(state):
+    #
+    # phase speed of the fastest gravity wave (the largest eigenvalue of the
+    # vertical level coupling), 0 for the semi-implicit scheme which treats
+    # the gravity waves implicitly
+    #
+    from .semi_implicit import vertical_operators
+
+    if state.const.SCHEME == "semi-implicit":
+        return 0.0
+    M = vertical_operators(state)[3]
+    return float(np.sqrt(np.linalg.eigvals(M).real.max()))
+
+
+def courant_number(state, c=0.0):
+    #
+    # largest Courant number of the true winds uw/vw (of the last trend) plus
+    # the gravity wave speed c over the grid distances dx/dy and DT, with
+    # the polar filter no shorter dx than on the latitude POLAR
+    #
+    const = state.const
+    array = state.array
+    inner = field()
+    dx = metric(array.dx)
+    if const.POLAR is not None:
+        dx = np.maximum(dx, const.RE * np.cos(np.radians(const.POLAR)) * array.dlam)
+    speed = (np.abs(array.uw[inner]) + c) / dx + (
+        np.abs(array.vw[inner]) + c
+    ) / array.dy
+    return const.DT * float(speed.max())
+
+
+class CFL_CONTROL:
+    #
+    # adaptive time step of the target Courant number const.CFL, never
+    # larger than the output, restart and integration interval
+    #
+    def __init__(self, state):
+        const = state.const
+        self.state = state
+        self.c = gravity_wave_speed(state)
+        self.dtmax = min(
+            3600.0 * interval
+            for interval in (const.output_int, const.restart_int, const.TF)
+            if interval > 0
+        )
+        self.cfl = None  # Courant number of the last check
+
+    def adapt(self, n, grow=True):
+        #
+        # new DT after time step n (or before the first one), None keeps DT
+        #
+        const = self.state.const
+        self.cfl = courant_number(self.state, self.c)
+        if not math.isfinite(self.cfl):
+            raise FloatingPointError(
+                "model state is not finite after time step " + str(n)
+            )
+        dt = const.DT * const.CFL / self.cfl if self.cfl > 0 else math.inf
+        if self.cfl <= const.CFL:
+            if not grow or dt < SLACK * const.DT:
+                return None
+            dt = min(dt, GROWTH * const.DT)
+        dt = min(dt, self.dtmax)
+        # whole number of time steps until the end of the integration
+        # (a rest below 1e-6 DT is rounding of the accumulated model time)
+        remaining = 3600.0 * const.TF - self.state.scalar.ti
+        if remaining > 1e-6 * const.DT:
+            dt = remaining / max(1, math.ceil(remaining / dt - 1e-9))
+        if dt == const.DT:
+            return None
+        return dt
@@ -1,405 +1,469 @@
-from .variables import global_const, global_int, global_array
+import warnings
+
+import numpy as np
+
+from . import parallel
+from . import polar
+from . import profiling
+from . import trend_numba
+from . import trend_reference
+from .indices import (
+    field as _field,
+    layer as _layer,
+    levels as _levels,
+    metric as _metric,
+    surface as _surface,
+)
 
 #                             #
 # Berechnen der Zeittendenzen #
 #                             #
 
 
-def true_wind_and_abs_ps():
+def true_wind_and_abs_ps(state):
     #
     # calculation of true wind component and absolute surface pressure
     #
-    for k in range(0, global_const.NK + 2):
-        for j in range(0, global_const.NJ + 2):
-            global_array.psg[j, k] = global_array.ps[j, k] + global_const.PS0
-            global_array.uw[j, k, :] = global_array.u[j, k, :] / global_array.psg[j, k]
-            global_array.vw[j, k, :] = global_array.v[j, k, :] / global_array.psg[j, k]
-            global_array.tw[j, k, :] = global_array.t[j, k, :] / global_array.psg[j, k]
+    const = state.const
+    array = state.array
+    array.psg[...] = array.ps + const.PS0
+    array.uw[...] = array.u / array.psg[..., None]
+    array.vw[...] = array.v / array.psg[..., None]
+    array.tw[...] = array.t / array.psg[..., None]
 
 
-def geopential():
+def _accumulator(state, a):
+    #
+    # float64 working copy of a float32 array for the vertical sums, or the
+    # array itself (float64 arrays or ACC64=False)
+    #
+    if state.const.ACC64 and a.dtype != np.float64:
+        return a.astype(np.float64)
+    return a
+
+
+def geopential(state):
     #
     # calculation of geopotential with hydrostatic equation
     #
-    global_array.gp[:, :, global_const.NL - 1] = (
-        global_array.phis[:, :]
-        + global_const.RD
-        * global_array.tw[:, :, global_const.NL - 1]
-        * global_array.alp[global_const.NL - 1]
+    const = state.const
+    array = state.array
+    tw = _accumulator(state, array.tw)
+    #
+    # thickness of the layers from the top level down, summed up from the
+    # surface geopotential with a reversed cumulative sum over the levels
+    #
+    dgp = np.empty_like(tw)
+    dgp[..., const.NL - 1] = (
+        array.phis + tw[..., const.NL - 1] * array.rdalp[const.NL - 1]
     )
-    for l in range(global_const.NL - 2, -1, -1):
-        global_array.gp[:, :, l] = (
-            global_array.gp[:, :, l + 1]
-            + global_const.RD
-            * (global_array.tw[:, :, l] + global_array.tw[:, :, l + 1])
-            * global_array.alp[l]
-        )
+    dgp[..., : const.NL - 1] = (tw[..., :-1] + tw[..., 1:]) * array.rdalp[:-1]
+    if dgp.dtype == array.gp.dtype:
+        np.cumsum(dgp[..., ::-1], axis=-1, out=array.gp[..., ::-1])
+    else:
+        array.gp[...] = np.cumsum(dgp[..., ::-1], axis=-1)[..., ::-1]
+
+
+def _zonal_pressure_gradient(state):
+    const = state.const
+    array = state.array
+    return (
+        -const.RD
+        * (array.tw[_field()] + const.T0)
+        * (array.ps[_surface(1, 0)] - array.ps[_surface(-1, 0)])
+        - array.psg[_surface()] * (array.gp[_field(1, 0)] - array.gp[_field(-1, 0)])
+    ) * _metric(array.rdx2)
 
 
-def zonal_pressure_gradient_force():
+def zonal_pressure_gradient_force(state):
     #
     # zonal pressure gradient force
     #
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            global_array.apx[j, k, :] = (
-                -global_const.RD
-                * (global_array.tw[j, k, :] + global_const.T0)
-                * (global_array.ps[j + 1, k] - global_array.ps[j - 1, k])
-                / global_array.dx[k]
-                / 2.0
-                - global_array.psg[j, k]
-                * (global_array.gp[j + 1, k, :] - global_array.gp[j - 1, k, :])
-                / global_array.dx[k]
-                / 2.0
-            )
+    state.array.apx[_field()] = _zonal_pressure_gradient(state)
+
+
+def _meridional_pressure_gradient(state):
+    const = state.const
+    array = state.array
+    return (
+        -const.RD
+        * (array.tw[_field()] + const.T0)
+        * (array.ps[_surface(0, 1)] - array.ps[_surface(0, -1)])
+        - array.psg[_surface()] * (array.gp[_field(0, 1)] - array.gp[_field(0, -1)])
+    ) * array.rdy2
 
 
-def meridional_pressure_gradient_force():
+def meridional_pressure_gradient_force(state):
     #
     # meridional pressure gradient force
     #
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            global_array.apy[j, k, :] = (
-                -global_const.RD
-                * (global_array.tw[j, k, :] + global_const.T0)
-                * (global_array.ps[j, k + 1] - global_array.ps[j, k - 1])
-                / global_array.dy
-                / 2.0
-                - global_array.psg[j, k]
-                * (global_array.gp[j, k + 1, :] - global_array.gp[j, k - 1, :])
-                / global_array.dy
-                / 2.0
-            )
+    state.array.apy[_field()] = _meridional_pressure_gradient(state)
 
 
-def corioles_and_centrifugal_force():
+def _coriolis_parameter(state):
+    # coriolis parameter including the centrifugal term
+    array = state.array
+    return _metric(array.f) + array.uw[_field()] * _metric(array.fcen)
+
+
+def corioles_and_centrifugal_force(state):
     #
     # coriolis and centrifugal force
     #
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            global_array.acx[j, k, :] = (
-                global_array.f[k]
-                + global_array.uw[j, k, :]
-                * global_array.sn[k]
-                / global_array.cs[k]
-                / global_const.RE
-            ) * global_array.v[j, k, :]
-            global_array.acy[j, k, :] = (
-                -(
-                    global_array.f[k]
-                    + global_array.uw[j, k, :]
-                    * global_array.sn[k]
-                    / global_array.cs[k]
-                    / global_const.RE
-                )
-                * global_array.u[j, k, :]
-            )
-
-
-def div_zonal_impulse():
+    array = state.array
+    array.acx[_field()] = _coriolis_parameter(state) * array.v[_field()]
+    array.acy[_field()] = -_coriolis_parameter(state) * array.u[_field()]
+
+
+def _div_zonal_flow(array, w):
+    #
+    # zonal divergence of the flow of w with mass-weighted wind a
+    #
+    # The reference implementation only keeps the zonal part of the flux
+    # divergence (its meridional part is a dangling expression statement), so
+    # the meridional part is left out here as well to stay bit-compatible.
+    #
+    return (
+        (
+            (array.u[_field(1, 0)] + array.u[_field()])
+            * (w[_field(1, 0)] + w[_field()])
+            - (array.u[_field()] + array.u[_field(-1, 0)])
+            * (w[_field()] + w[_field(-1, 0)])
+        )
+    ) * _metric(array.rdx4)
+
+
+def div_zonal_impulse(state):
     #
     # zonal divergence of momentum
     #
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            global_array.du[j, k, :] = (
-                (
-                    (global_array.u[j + 1, k, :] + global_array.u[j, k, :])
-                    * (global_array.uw[j + 1, k, :] + global_array.uw[j, k, :])
-                    - (global_array.u[j, k, :] + global_array.u[j - 1, k, :])
-                    * (global_array.uw[j, k, :] + global_array.uw[j - 1, k, :])
-                )
-                / 4.0
-                / global_array.dx[k]
-            )
-            +(
-                (
-                    global_array.v[j, k + 1, :] * global_array.cs[k + 1]
-                    + global_array.v[j, k, :] * global_array.cs[k]
-                )
-                * (global_array.uw[j, k + 1, :] + global_array.uw[j, k, :])
-                - (
-                    global_array.v[j, k, :] * global_array.cs[k]
-                    + global_array.v[j, k - 1, :] * global_array.cs[k - 1]
-                )
-                * (global_array.uw[j, k, :] + global_array.uw[j, k - 1, :])
-            ) / 4.0 / global_array.dy / global_array.cs[k]
-
-
-def div_meridional_impulse():
+    array = state.array
+    array.du[_field()] = _div_zonal_flow(array, array.uw)
+
+
+def div_meridional_impulse(state):
     #
     # meridional divergence of momentum
     #
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            global_array.dv[j, k, :] = (
-                (
-                    (global_array.u[j + 1, k, :] + global_array.u[j, k, :])
-                    * (global_array.vw[j + 1, k, :] + global_array.vw[j, k, :])
-                    - (global_array.u[j, k, :] + global_array.u[j - 1, k, :])
-                    * (global_array.vw[j, k, :] + global_array.vw[j - 1, k, :])
-                )
-                / 4.0
-                / global_array.dx[k]
-            )
-            +(
-                (
-                    global_array.v[j, k + 1, :] * global_array.cs[k + 1]
-                    + global_array.v[j, k, :] * global_array.cs[k]
-                )
-                * (global_array.vw[j, k + 1, :] + global_array.vw[j, k, :])
-                - (
-                    global_array.v[j, k, :] * global_array.cs[k]
-                    + global_array.v[j, k - 1, :] * global_array.cs[k - 1]
-                )
-                * (global_array.vw[j, k, :] + global_array.vw[j, k - 1, :])
-            ) / 4.0 / global_array.dy / global_array.cs[k]
-
-
-def div_temperature_flow():
+    array = state.array
+    array.dv[_field()] = _div_zonal_flow(array, array.vw)
+
+
+def div_temperature_flow(state):
     #
     # divergence of temperature flow
     #
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            global_array.dvt[j, k, :] = (
-                (
-                    (global_array.u[j + 1, k, :] + global_array.u[j, k, :])
-                    * (global_array.tw[j + 1, k, :] + global_array.tw[j, k, :])
-                    - (global_array.u[j, k, :] + global_array.u[j - 1, k, :])
-                    * (global_array.tw[j, k, :] + global_array.tw[j - 1, k, :])
-                )
-                / 4.0
-                / global_array.dx[k]
-            )
-            +(
-                (
-                    global_array.v[j, k + 1, :] * global_array.cs[k + 1]
-                    + global_array.v[j, k, :] * global_array.cs[k]
-                )
-                * (global_array.tw[j, k + 1, :] + global_array.tw[j, k, :])
-                - (
-                    global_array.v[j, k, :] * global_array.cs[k]
-                    + global_array.v[j, k - 1, :] * global_array.cs[k - 1]
-                )
-                * (global_array.tw[j, k, :] + global_array.tw[j, k - 1, :])
-            ) / 4.0 / global_array.dy / global_array.cs[k]
-
-
-def div_weighted_wind():
+    array = state.array
+    array.dvt[_field()] = _div_zonal_flow(array, array.tw)
+
+
+def div_weighted_wind(state):
     #
     # divergence of mass-wighted wind
     #
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            global_array.d[j, k, :] = (
-                (global_array.u[j + 1, k, :] - global_array.u[j - 1, k, :])
-                / 2.0
-                / global_array.dx[k]
-                + (
-                    global_array.v[j, k + 1, :] * global_array.cs[k + 1]
-                    - global_array.v[j, k - 1, :] * global_array.cs[k - 1]
-                )
-                / global_array.cs[k]
-                / global_array.dy
-                / 2.0
-            )
+    array = state.array
+    array.d[_field()] = (array.u[_field(1, 0)] - array.u[_field(-1, 0)]) * _metric(
+        array.rdx2
+    ) + (
+        array.v[_field(0, 1)] * _metric(array.cs, 1)
+        - array.v[_field(0, -1)] * _metric(array.cs, -1)
+    ) * _metric(
+        array.rcsdy2
+    )
 
 
-def sigma_flow():
+def sigma_flow(state):
     #
     # divergence of mass flow between SIGMA=0 and SIGMA=SIGMA[l]
     #
-    global_array.dm[:, :, 1] = global_array.d[:, :, 1] * global_int.dsig
-    for l in range(2, global_const.NL):
-        global_array.dm[:, :, l] = (
-            global_array.dm[:, :, l - 1] + global_array.d[:, :, l] * global_int.dsig
-        )
+    const = state.const
+    array = state.array
+    scalar = state.scalar
+    d = _accumulator(state, array.d[_levels(1, const.NL)])
+    array.dm[_levels(1, const.NL)] = np.cumsum(d * scalar.dsig, axis=-1)
 
 
 # maybe index error
-def vert_speed_sigma():
+def vert_speed_sigma(state):
     #
     # calculation of vertial velocity in SIGMA system
     #
-    for l in range(0, global_const.NL - 2):
-        global_array.dsdt[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l] = (
-            global_array.sigma[l]
-            / global_array.psg[1 : global_const.NJ + 1, 1 : global_const.NK + 1]
-            * global_array.dm[
-                1 : global_const.NJ + 1, 1 : global_const.NK + 1, global_const.NL - 1
-            ]
-            - global_array.dm[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-            / global_array.psg[1 : global_const.NJ + 1, 1 : global_const.NK + 1]
-        )
+    const = state.const
+    state.array.dsdt[_levels(0, const.NL - 2)] = _vert_speed(state)
+
+
+def _vert_speed(state):
+    # vertical velocity of the levels l < NL - 2
+    const = state.const
+    array = state.array
+    return (
+        array.sigma[: const.NL - 2]
+        / array.psg[_surface()]
+        * array.dm[_levels(const.NL - 1, const.NL)]
+        - array.dm[_levels(0, const.NL - 2)] / array.psg[_surface()]
+    )
 
 
-def adiabatic_heating():
+def adiabatic_heating(state):
     #
     # calculation of adiabatic compression heat
     #
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            global_array.comp[j, k, :] = (
-                global_const.FKAP
-                * (global_array.tw[j, k, :] + global_const.T0)
-                * (
-                    global_array.uw[j, k, :]
-                    * (global_array.ps[j + 1, k] - global_array.ps[j - 1, k])
-                    / global_array.dx[k]
-                    / 2.0
-                    + global_array.vw[j, k, :]
-                    * (global_array.ps[j, k + 1] - global_array.ps[j, k - 1])
-                    / global_array.dy
-                    / 2.0
-                )
-            )
-
-    global_array.comp[1 : global_const.NJ + 1, 1 : global_const.NK + 1, 0] = (
-        global_array.comp[1 : global_const.NJ + 1, 1 : global_const.NK + 1, 0]
-        - global_const.FKAP
+    _adiabatic_heating(state, state.array.comp)
+
+
+def _adiabatic_heating(state, comp):
+    const = state.const
+    array = state.array
+    comp[_field()] = (
+        const.FKAP
+        * (array.tw[_field()] + const.T0)
         * (
-            global_array.tw[1 : global_const.NJ + 1, 1 : global_const.NK + 1, 1]
-            + global_const.T0
+            array.uw[_field()]
+            * (array.ps[_surface(1, 0)] - array.ps[_surface(-1, 0)])
+            * _metric(array.rdx2)
+            + array.vw[_field()]
+            * (array.ps[_surface(0, 1)] - array.ps[_surface(0, -1)])
+            * array.rdy2
         )
-        * global_array.alp[1]
-        * global_array.d[1 : global_const.NJ + 1, 1 : global_const.NK + 1, 1]
     )
-    for l in range(1, global_const.NL):
-        global_array.comp[
-            1 : global_const.NJ + 1, 1 : global_const.NK + 1, l
-        ] = global_array.comp[
-            1 : global_const.NJ + 1, 1 : global_const.NK + 1, l
-        ] - global_const.FKAP * (
-            global_array.tw[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-            + global_const.T0
-        ) * (
-            global_array.alp[l]
-            * global_array.d[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-            + (global_array.alp[l] + global_array.alp[l - 1])
-            * global_array.dm[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l - 1]
-            / global_int.dsig
+
+    comp[_layer(0)] -= (
+        const.FKAP
+        * (array.tw[_layer(1)] + const.T0)
+        * array.alp[1]
+        * array.d[_layer(1)]
+    )
+    comp[_levels(1, const.NL)] -= (
+        const.FKAP
+        * (array.tw[_levels(1, const.NL)] + const.T0)
+        * (
+            array.alp[1:] * array.d[_levels(1, const.NL)]
+            + array.ralps[1:] * array.dm[_levels(0, const.NL - 1)]
         )
+    )
+
+
+def _vert_below(NL):
+    #
+    # levels of the vertical velocity and of the field below the levels
+    # l < NL - 1 of the vertical flow, as in the reference loops the velocity
+    # below level 0 is the one of level NL - 1 and the field below levels 0
+    # and 1 is the one of level 1
+    #
+    l = np.arange(NL - 1)
+    return l - 1, np.maximum(l - 1, 1)
 
 
-def div_vert_advection():
+def _vert_flow(state, w, dsdt):
+    #
+    # vertical flow divergence of w on the levels l < NL - 1 with the
+    # vertical velocity dsdt of all levels (interior)
+    #
+    NL = state.const.NL
+    below, lm = _vert_below(NL)
+    w_l = w[_levels(0, NL - 1)]
+    return (
+        dsdt[..., : NL - 1] * (w[_levels(1, NL)] + w_l)
+        - dsdt[..., below] * (w_l + w[_field()][..., lm])
+    ) * state.array.r2dsig
+
+
+def div_vert_advection(state):
     #
     # calculation of divergence of vertical advective flow
     #
-    for l in range(0, global_const.NL - 1):
-        lp = l + 1
-        lm = l - 1
-        if lp > global_const.NL:
-            lp = global_const.NL
-        if lm < 1:
-            lm = 1
-        global_array.vdivu[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l] = (
-            global_array.dsdt[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-            * (
-                global_array.u[1 : global_const.NJ + 1, 1 : global_const.NK + 1, lp]
-                + global_array.u[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-            )
-            / 2.0
-            - global_array.dsdt[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l - 1]
-            * (
-                global_array.u[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-                + global_array.u[1 : global_const.NJ + 1, 1 : global_const.NK + 1, lm]
-            )
-            / 2.0
-        ) / global_int.dsig
-        global_array.vdivv[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l] = (
-            global_array.dsdt[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-            * (
-                global_array.v[1 : global_const.NJ + 1, 1 : global_const.NK + 1, lp]
-                + global_array.v[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-            )
-            / 2.0
-            - global_array.dsdt[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l - 1]
-            * (
-                global_array.v[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-                + global_array.v[1 : global_const.NJ + 1, 1 : global_const.NK + 1, lm]
-            )
-            / 2.0
-        ) / global_int.dsig
-        global_array.vdivt[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l] = (
-            global_array.dsdt[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-            * (
-                global_array.t[1 : global_const.NJ + 1, 1 : global_const.NK + 1, lp]
-                + global_array.t[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-            )
-            / 2.0
-            - global_array.dsdt[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l - 1]
-            * (
-                global_array.t[1 : global_const.NJ + 1, 1 : global_const.NK + 1, l]
-                + global_array.t[1 : global_const.NJ + 1, 1 : global_const.NK + 1, lm]
-            )
-            / 2.0
-        ) / global_int.dsig
-
-
-def summarize_trends():
+    const = state.const
+    array = state.array
+    dsdt = array.dsdt[_field()]
+    levels = _levels(0, const.NL - 1)
+    array.vdivu[levels] = _vert_flow(state, array.u, dsdt)
+    array.vdivv[levels] = _vert_flow(state, array.v, dsdt)
+    array.vdivt[levels] = _vert_flow(state, array.t, dsdt)
+
+
+def summarize_trends(state):
     #
     # summarize trends
     #
-    for k in range(1, global_const.NK + 1):
-        for j in range(1, global_const.NJ + 1):
-            global_array.ut[j, k, :] = (
-                global_array.acx[j, k, :]
-                + global_array.apx[j, k, :]
-                - global_array.du[j, k, :]
-                - global_array.vdivu[j, k, :]
-                + global_array.diffu[j, k, :]
-            )
-            global_array.vt[j, k, :] = (
-                global_array.acy[j, k, :]
-                + global_array.apy[j, k, :]
-                - global_array.dv[j, k, :]
-                - global_array.vdivv[j, k, :]
-                + global_array.diffv[j, k, :]
-            )
-            global_array.tt[j, k, :] = (
-                -global_array.dvt[j, k, :]
-                + global_array.comp[j, k, :]
-                - global_array.vdivt[j, k, :]
-                + global_array.difft[j, k, :]
-            )
-            global_array.pst[j, k] = -global_array.dm[j, k, global_const.NL - 1]
+    const = state.const
+    array = state.array
+    array.ut[_field()] = (
+        array.acx[_field()]
+        + array.apx[_field()]
+        - array.du[_field()]
+        - array.vdivu[_field()]
+        + array.diffu[_field()]
+    )
+    array.vt[_field()] = (
+        array.acy[_field()]
+        + array.apy[_field()]
+        - array.dv[_field()]
+        - array.vdivv[_field()]
+        + array.diffv[_field()]
+    )
+    array.tt[_field()] = (
+        -array.dvt[_field()]
+        + array.comp[_field()]
+        - array.vdivt[_field()]
+        + array.difft[_field()]
+    )
+    surface_pressure_trend(state)
+
+
+def surface_pressure_trend(state):
+    const = state.const
+    array = state.array
+    array.pst[_surface()] = -array.dm[_field()][..., const.NL - 1 :]
+
+
+#
+# lean mode: the terms are summed up in the trends in the order of
+# summarize_trends, without storing them
+#
+def lean_coriolis_force(state):
+    array = state.array
+    array.ut[_field()] = _coriolis_parameter(state) * array.v[_field()]
+    array.vt[_field()] = -_coriolis_parameter(state) * array.u[_field()]
+
+
+def lean_pressure_gradient_force(state):
+    array = state.array
+    array.ut[_field()] += _zonal_pressure_gradient(state)
+    array.vt[_field()] += _meridional_pressure_gradient(state)
+
+
+def lean_div_horizontal_flow(state):
+    array = state.array
+    array.ut[_field()] -= _div_zonal_flow(array, array.uw)
+    array.vt[_field()] -= _div_zonal_flow(array, array.vw)
+    array.tt[_field()] = -_div_zonal_flow(array, array.tw)
+
+
+def lean_adiabatic_heating(state):
+    array = state.array
+    _adiabatic_heating(state, array.scratch)
+    array.tt[_field()] += array.scratch[_field()]
+
+
+def lean_div_vert_advection(state):
+    const = state.const
+    array = state.array
+    #
+    # vertical velocity, zero for the two top levels as in vert_speed_sigma
+    #
+    dsdt = array.scratch[_field()]
+    dsdt[..., : const.NL - 2] = _vert_speed(state)
+    dsdt[..., const.NL - 2 :] = 0.0
+    levels = _levels(0, const.NL - 1)
+    array.ut[levels] -= _vert_flow(state, array.u, dsdt)
+    array.vt[levels] -= _vert_flow(state, array.v, dsdt)
+    array.tt[levels] -= _vert_flow(state, array.t, dsdt)
 
 
 #############################################################
 
 
-def trend():
-    true_wind_and_abs_ps()
-    geopential()
-    zonal_pressure_gradient_force()
-    meridional_pressure_gradient_force()
-    corioles_and_centrifugal_force()
-    div_zonal_impulse()
-    div_meridional_impulse()
-    div_temperature_flow()
-    div_weighted_wind()
-    sigma_flow()
-    vert_speed_sigma()
-    adiabatic_heating()
-    div_vert_advection()
-    summarize_trends()
+_numba_warned = False
 
 
-if __name__ == "__main__":
-    import grid
+def _warn_numba_fallback():
+    global _numba_warned
+    if not _numba_warned:
+        warnings.warn("numba is not installed, using the numpy trend backend")
+        _numba_warned = True
+
+
+_COLUMN_KERNELS = [true_wind_and_abs_ps, geopential]
+_TENDENCY_KERNELS = [
+    zonal_pressure_gradient_force,
+    meridional_pressure_gradient_force,
+    corioles_and_centrifugal_force,
+    div_zonal_impulse,
+    div_meridional_impulse,
+    div_temperature_flow,
+    div_weighted_wind,
+    sigma_flow,
+    vert_speed_sigma,
+    adiabatic_heating,
+    div_vert_advection,
+    summarize_trends,
+]
+
+
+def _numpy_columns(state, k0, k1):
+    band = parallel.band_state(state, k0, k1)
+    for kernel in _COLUMN_KERNELS:
+        profiling.call(band, kernel, band)
+
+
+_LEAN_TENDENCY_KERNELS = [
+    lean_coriolis_force,
+    lean_pressure_gradient_force,
+    lean_div_horizontal_flow,
+    div_weighted_wind,
+    sigma_flow,
+    lean_adiabatic_heating,
+    lean_div_vert_advection,
+    surface_pressure_trend,
+]
+
 
-    grid.grid()
+def _numpy_tendencies(state, k0, k1):
+    band = parallel.band_state(state, k0 - 1, k1 + 1)
+    lean = state.const.LEAN
+    for kernel in _LEAN_TENDENCY_KERNELS if lean else _TENDENCY_KERNELS:
+        profiling.call(band, kernel, band)
 
-    import init
 
-    init.init_case()
+def _numba_columns(state, k0, k1):
+    profiling.call(state, trend_numba.columns, state, k0, k1, name="numba_columns")
 
-    import boundary_conditions
 
-    boundary_conditions.boundary_conditions()
+def _numba_tendencies(state, k0, k1):
+    profiling.call(
+        state, trend_numba.tendencies, state, k0, k1, name="numba_tendencies"
+    )
+
+
+def _banded(state, columns, tendencies):
+    #
+    # column quantities on all latitudes first, then the tendencies of the
+    # interior, each split into latitude bands when running multi-threaded
+    #
+    NK = state.const.NK
+    n = state.const.NTHREADS
+    parallel.run(lambda k0, k1: columns(state, k0, k1), parallel.bands(0, NK + 2, n), n)
+    parallel.run(
+        lambda k0, k1: tendencies(state, k0, k1), parallel.bands(1, NK + 1, n), n
+    )
+
+
+def trend(state):
+    backend = state.const.BACKEND
+    if backend == "numba" and not trend_numba.available:
+        _warn_numba_fallback()
+        backend = "numpy"
+    if backend == "reference":
+        if state.const.LEAN:
+            raise ValueError("LEAN needs the numpy or numba trend backend")
+        for member in state.member_states():
+            trend_reference.trend(member)
+    elif backend == "numba":
+        _banded(state, _numba_columns, _numba_tendencies)
+    elif backend == "numpy":
+        _banded(state, _numpy_columns, _numpy_tendencies)
+    else:
+        raise ValueError("Unknown trend backend: " + str(backend))
+    if state.const.POLAR is not None:
+        polar.filter_trends(state)
 
-    trend()
+
+if __name__ == "__main__":
+    from .variables import ModelState
+    from . import grid, init, boundary_conditions
+
+    state = ModelState()
+    grid.grid(state)
+    init.init_case(state)
+    boundary_conditions.boundary_conditions(state)
+    trend(state)
@@ -0,0 +1,405 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+#                                               #
+# Berechnen der Zeittendenzen                   #
+# compiled backend: all tendency terms of a     #
+# grid column are computed in one fused pass    #
+#                                               #
+
+available = njit is not None  # False falls back to the numpy backend
+
+
+def _jit(function):
+    if njit is None:
+        return function
+    return njit(cache=True, nogil=True)(function)
+
+
+@_jit
+def _true_fields(ps, phis, u, v, t, rdalp, PS0, psg, uw, vw, tw, gp, k0, k1):
+    #
+    # true wind, temperature and absolute surface pressure, followed by the
+    # geopotential with hydrostatic equation on the latitudes k0 <= k < k1
+    # (including the boundaries)
+    #
+    nj, nk, nl = u.shape
+    for j in range(nj):
+        for k in range(k0, k1):
+            psg[j, k] = ps[j, k] + PS0
+            for l in range(nl):
+                uw[j, k, l] = u[j, k, l] / psg[j, k]
+                vw[j, k, l] = v[j, k, l] / psg[j, k]
+                tw[j, k, l] = t[j, k, l] / psg[j, k]
+            # summed up in float64 also for float32 arrays
+            acc = np.float64(phis[j, k]) + tw[j, k, nl - 1] * rdalp[nl - 1]
+            gp[j, k, nl - 1] = acc
+            for l in range(nl - 2, -1, -1):
+                acc = acc + (tw[j, k, l] + tw[j, k, l + 1]) * rdalp[l]
+                gp[j, k, l] = acc
+
+
+@_jit
+def _true_fields_planes(ps, phis, u, v, t, rdalp, PS0, psg, uw, vw, tw, gp, k0, k1):
+    #
+    # _true_fields for the "level" layout, the grid points of a latitude
+    # are the inner loop and the geopotential of the row is summed up level
+    # by level
+    #
+    nj, nk, nl = u.shape
+    acc = np.zeros(nj)
+    for k in range(k0, k1):
+        for j in range(nj):
+            psg[j, k] = ps[j, k] + PS0
+        for l in range(nl):
+            for j in range(nj):
+                uw[j, k, l] = u[j, k, l] / psg[j, k]
+                vw[j, k, l] = v[j, k, l] / psg[j, k]
+                tw[j, k, l] = t[j, k, l] / psg[j, k]
+        for j in range(nj):
+            acc[j] = np.float64(phis[j, k]) + tw[j, k, nl - 1] * rdalp[nl - 1]
+            gp[j, k, nl - 1] = acc[j]
+        for l in range(nl - 2, -1, -1):
+            for j in range(nj):
+                acc[j] = acc[j] + (tw[j, k, l] + tw[j, k, l + 1]) * rdalp[l]
+                gp[j, k, l] = acc[j]
+
+
+@_jit
+def _tendencies(
+    ps,
+    psg,
+    u,
+    v,
+    t,
+    uw,
+    vw,
+    tw,
+    gp,
+    diffu,
+    diffv,
+    difft,
+    rdx2,
+    rdx4,
+    rdy2,
+    rcsdy2,
+    cs,
+    fcen,
+    f,
+    sigma,
+    alp,
+    ralps,
+    dsig,
+    r2dsig,
+    RD,
+    T0,
+    FKAP,
+    ut,
+    vt,
+    tt,
+    pst,
+    k0,
+    k1,
+):
+    #
+    # tendencies of the interior columns of the latitudes k0 <= k < k1, the
+    # operation order follows trend.py term by term
+    #
+    nj, nk, nl = u.shape
+    d = np.zeros(nl)  # divergence of mass-weighted wind
+    dm = np.zeros(nl)  # divergence of mass flow
+    dsdt = np.zeros(nl)  # SIGMA vertical velocity
+    for j in range(1, nj - 1):
+        for k in range(k0, k1):
+            dpsx = ps[j + 1, k] - ps[j - 1, k]
+            dpsy = ps[j, k + 1] - ps[j, k - 1]
+            #
+            # divergence, mass flow and vertical velocity of the column
+            #
+            for l in range(nl):
+                d[l] = (u[j + 1, k, l] - u[j - 1, k, l]) * rdx2[k] + (
+                    v[j, k + 1, l] * cs[k + 1] - v[j, k - 1, l] * cs[k - 1]
+                ) * rcsdy2[k]
+            dm[1] = d[1] * dsig
+            for l in range(2, nl):
+                dm[l] = dm[l - 1] + d[l] * dsig
+            for l in range(0, nl - 2):
+                dsdt[l] = sigma[l] / psg[j, k] * dm[nl - 1] - dm[l] / psg[j, k]
+            #
+            # horizontal and vertical terms level by level
+            #
+            for l in range(nl):
+                apx = (
+                    -RD * (tw[j, k, l] + T0) * dpsx
+                    - psg[j, k] * (gp[j + 1, k, l] - gp[j - 1, k, l])
+                ) * rdx2[k]
+                apy = (
+                    -RD * (tw[j, k, l] + T0) * dpsy
+                    - psg[j, k] * (gp[j, k + 1, l] - gp[j, k - 1, l])
+                ) * rdy2
+                fc = f[k] + uw[j, k, l] * fcen[k]
+                acx = fc * v[j, k, l]
+                acy = -fc * u[j, k, l]
+                fue = u[j + 1, k, l] + u[j, k, l]  # mass flux east and west
+                fuw = u[j, k, l] + u[j - 1, k, l]
+                du = (
+                    fue * (uw[j + 1, k, l] + uw[j, k, l])
+                    - fuw * (uw[j, k, l] + uw[j - 1, k, l])
+                ) * rdx4[k]
+                dv = (
+                    fue * (vw[j + 1, k, l] + vw[j, k, l])
+                    - fuw * (vw[j, k, l] + vw[j - 1, k, l])
+                ) * rdx4[k]
+                dvt = (
+                    fue * (tw[j + 1, k, l] + tw[j, k, l])
+                    - fuw * (tw[j, k, l] + tw[j - 1, k, l])
+                ) * rdx4[k]
+                comp = (
+                    FKAP
+                    * (tw[j, k, l] + T0)
+                    * (uw[j, k, l] * dpsx * rdx2[k] + vw[j, k, l] * dpsy * rdy2)
+                )
+                if l == 0:
+                    comp = comp - FKAP * (tw[j, k, 1] + T0) * alp[1] * d[1]
+                else:
+                    comp = comp - FKAP * (tw[j, k, l] + T0) * (
+                        alp[l] * d[l] + ralps[l] * dm[l - 1]
+                    )
+                vdivu = 0.0
+                vdivv = 0.0
+                vdivt = 0.0
+                if l < nl - 1:
+                    lp = l + 1
+                    lm = max(l - 1, 1)
+                    lb = l - 1 if l > 0 else nl - 1
+                    vdivu = (
+                        dsdt[l] * (u[j, k, lp] + u[j, k, l])
+                        - dsdt[lb] * (u[j, k, l] + u[j, k, lm])
+                    ) * r2dsig
+                    vdivv = (
+                        dsdt[l] * (v[j, k, lp] + v[j, k, l])
+                        - dsdt[lb] * (v[j, k, l] + v[j, k, lm])
+                    ) * r2dsig
+                    vdivt = (
+                        dsdt[l] * (t[j, k, lp] + t[j, k, l])
+                        - dsdt[lb] * (t[j, k, l] + t[j, k, lm])
+                    ) * r2dsig
+                ut[j, k, l] = acx + apx - du - vdivu + diffu[j, k, l]
+                vt[j, k, l] = acy + apy - dv - vdivv + diffv[j, k, l]
+                tt[j, k, l] = -dvt + comp - vdivt + difft[j, k, l]
+            pst[j, k] = -dm[nl - 1]
+
+
+@_jit
+def _tendencies_planes(
+    ps,
+    psg,
+    u,
+    v,
+    t,
+    uw,
+    vw,
+    tw,
+    gp,
+    diffu,
+    diffv,
+    difft,
+    rdx2,
+    rdx4,
+    rdy2,
+    rcsdy2,
+    cs,
+    fcen,
+    f,
+    sigma,
+    alp,
+    ralps,
+    dsig,
+    r2dsig,
+    RD,
+    T0,
+    FKAP,
+    ut,
+    vt,
+    tt,
+    pst,
+    k0,
+    k1,
+):
+    #
+    # _tendencies for the "level" layout: the column profiles of a latitude
+    # row first, then the terms level by level with the grid points of the
+    # row as the inner loop
+    #
+    nj, nk, nl = u.shape
+    d = np.zeros((nl, nj))  # divergence of mass-weighted wind
+    dm = np.zeros((nl, nj))  # divergence of mass flow
+    dsdt = np.zeros((nl, nj))  # SIGMA vertical velocity
+    for k in range(k0, k1):
+        #
+        # divergence, mass flow and vertical velocity of the columns
+        #
+        for l in range(nl):
+            for j in range(1, nj - 1):
+                d[l, j] = (u[j + 1, k, l] - u[j - 1, k, l]) * rdx2[k] + (
+                    v[j, k + 1, l] * cs[k + 1] - v[j, k - 1, l] * cs[k - 1]
+                ) * rcsdy2[k]
+        for j in range(1, nj - 1):
+            dm[1, j] = d[1, j] * dsig
+        for l in range(2, nl):
+            for j in range(1, nj - 1):
+                dm[l, j] = dm[l - 1, j] + d[l, j] * dsig
+        for l in range(0, nl - 2):
+            for j in range(1, nj - 1):
+                dsdt[l, j] = sigma[l] / psg[j, k] * dm[nl - 1, j] - dm[l, j] / psg[j, k]
+        #
+        # horizontal and vertical terms level by level
+        #
+        for l in range(nl):
+            lp = l + 1
+            lm = max(l - 1, 1)
+            lb = l - 1 if l > 0 else nl - 1
+            for j in range(1, nj - 1):
+                dpsx = ps[j + 1, k] - ps[j - 1, k]
+                dpsy = ps[j, k + 1] - ps[j, k - 1]
+                apx = (
+                    -RD * (tw[j, k, l] + T0) * dpsx
+                    - psg[j, k] * (gp[j + 1, k, l] - gp[j - 1, k, l])
+                ) * rdx2[k]
+                apy = (
+                    -RD * (tw[j, k, l] + T0) * dpsy
+                    - psg[j, k] * (gp[j, k + 1, l] - gp[j, k - 1, l])
+                ) * rdy2
+                fc = f[k] + uw[j, k, l] * fcen[k]
+                acx = fc * v[j, k, l]
+                acy = -fc * u[j, k, l]
+                fue = u[j + 1, k, l] + u[j, k, l]  # mass flux east and west
+                fuw = u[j, k, l] + u[j - 1, k, l]
+                du = (
+                    fue * (uw[j + 1, k, l] + uw[j, k, l])
+                    - fuw * (uw[j, k, l] + uw[j - 1, k, l])
+                ) * rdx4[k]
+                dv = (
+                    fue * (vw[j + 1, k, l] + vw[j, k, l])
+                    - fuw * (vw[j, k, l] + vw[j - 1, k, l])
+                ) * rdx4[k]
+                dvt = (
+                    fue * (tw[j + 1, k, l] + tw[j, k, l])
+                    - fuw * (tw[j, k, l] + tw[j - 1, k, l])
+                ) * rdx4[k]
+                comp = (
+                    FKAP
+                    * (tw[j, k, l] + T0)
+                    * (uw[j, k, l] * dpsx * rdx2[k] + vw[j, k, l] * dpsy * rdy2)
+                )
+                if l == 0:
+                    comp = comp - FKAP * (tw[j, k, 1] + T0) * alp[1] * d[1, j]
+                else:
+                    comp = comp - FKAP * (tw[j, k, l] + T0) * (
+                        alp[l] * d[l, j] + ralps[l] * dm[l - 1, j]
+                    )
+                vdivu = 0.0
+                vdivv = 0.0
+                vdivt = 0.0
+                if l < nl - 1:
+                    vdivu = (
+                        dsdt[l, j] * (u[j, k, lp] + u[j, k, l])
+                        - dsdt[lb, j] * (u[j, k, l] + u[j, k, lm])
+                    ) * r2dsig
+                    vdivv = (
+                        dsdt[l, j] * (v[j, k, lp] + v[j, k, l])
+                        - dsdt[lb, j] * (v[j, k, l] + v[j, k, lm])
+                    ) * r2dsig
+                    vdivt = (
+                        dsdt[l, j] * (t[j, k, lp] + t[j, k, l])
+                        - dsdt[lb, j] * (t[j, k, l] + t[j, k, lm])
+                    ) * r2dsig
+                ut[j, k, l] = acx + apx - du - vdivu + diffu[j, k, l]
+                vt[j, k, l] = acy + apy - dv - vdivv + diffv[j, k, l]
+                tt[j, k, l] = -dvt + comp - vdivt + difft[j, k, l]
+        for j in range(1, nj - 1):
+            pst[j, k] = -dm[nl - 1, j]
+
+
+def columns(state, k0, k1):
+    for member in state.member_states():
+        _columns(member, k0, k1)
+
+
+def tendencies(state, k0, k1):
+    for member in state.member_states():
+        _tendencies_of(member, k0, k1)
+
+
+def _columns(state, k0, k1):
+    const = state.const
+    array = state.array
+    true_fields = _true_fields_planes if const.LAYOUT == "level" else _true_fields
+    true_fields(
+        array.ps,
+        array.phis,
+        array.u,
+        array.v,
+        array.t,
+        array.rdalp,
+        const.PS0,
+        array.psg,
+        array.uw,
+        array.vw,
+        array.tw,
+        array.gp,
+        k0,
+        k1,
+    )
+
+
+def _tendencies_of(state, k0, k1):
+    const = state.const
+    array = state.array
+    scalar = state.scalar
+    if array.diffu is None:
+        # lean mode: no diffusion arrays, zeros without memory
+        zero = np.broadcast_to(np.zeros((), array.u.dtype), array.u.shape)
+        diffu = diffv = difft = zero
+    else:
+        diffu, diffv, difft = array.diffu, array.diffv, array.difft
+    kernel = _tendencies_planes if const.LAYOUT == "level" else _tendencies
+    kernel(
+        array.ps,
+        array.psg,
+        array.u,
+        array.v,
+        array.t,
+        array.uw,
+        array.vw,
+        array.tw,
+        array.gp,
+        diffu,
+        diffv,
+        difft,
+        array.rdx2,
+        array.rdx4,
+        array.rdy2,
+        array.rcsdy2,
+        array.cs,
+        array.fcen,
+        array.f,
+        array.sigma,
+        array.alp,
+        array.ralps,
+        scalar.dsig,
+        array.r2dsig,
+        const.RD,
+        const.T0,
+        const.FKAP,
+        array.ut,
+        array.vt,
+        array.tt,
+        array.pst,
+        k0,
+        k1,
+    )
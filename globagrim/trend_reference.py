@@ -0,0 +1,391 @@
+#                                                      #
+# Berechnen der Zeittendenzen                          #
+# reference implementation looping over grid points,   #
+# kept to validate the vectorized kernels in trend.py  #
+#                                                      #
+
+
+def true_wind_and_abs_ps(state):
+    #
+    # calculation of true wind component and absolute surface pressure
+    #
+    const = state.const
+    array = state.array
+    for k in range(0, const.NK + 2):
+        for j in range(0, const.NJ + 2):
+            array.psg[j, k] = array.ps[j, k] + const.PS0
+            array.uw[j, k, :] = array.u[j, k, :] / array.psg[j, k]
+            array.vw[j, k, :] = array.v[j, k, :] / array.psg[j, k]
+            array.tw[j, k, :] = array.t[j, k, :] / array.psg[j, k]
+
+
+def geopential(state):
+    #
+    # calculation of geopotential with hydrostatic equation
+    #
+    const = state.const
+    array = state.array
+    array.gp[:, :, const.NL - 1] = (
+        array.phis[:, :]
+        + const.RD * array.tw[:, :, const.NL - 1] * array.alp[const.NL - 1]
+    )
+    for l in range(const.NL - 2, -1, -1):
+        array.gp[:, :, l] = (
+            array.gp[:, :, l + 1]
+            + const.RD * (array.tw[:, :, l] + array.tw[:, :, l + 1]) * array.alp[l]
+        )
+
+
+def zonal_pressure_gradient_force(state):
+    #
+    # zonal pressure gradient force
+    #
+    const = state.const
+    array = state.array
+    for k in range(1, const.NK + 1):
+        for j in range(1, const.NJ + 1):
+            array.apx[j, k, :] = (
+                -const.RD
+                * (array.tw[j, k, :] + const.T0)
+                * (array.ps[j + 1, k] - array.ps[j - 1, k])
+                / array.dx[k]
+                / 2.0
+                - array.psg[j, k]
+                * (array.gp[j + 1, k, :] - array.gp[j - 1, k, :])
+                / array.dx[k]
+                / 2.0
+            )
+
+
+def meridional_pressure_gradient_force(state):
+    #
+    # meridional pressure gradient force
+    #
+    const = state.const
+    array = state.array
+    for k in range(1, const.NK + 1):
+        for j in range(1, const.NJ + 1):
+            array.apy[j, k, :] = (
+                -const.RD
+                * (array.tw[j, k, :] + const.T0)
+                * (array.ps[j, k + 1] - array.ps[j, k - 1])
+                / array.dy
+                / 2.0
+                - array.psg[j, k]
+                * (array.gp[j, k + 1, :] - array.gp[j, k - 1, :])
+                / array.dy
+                / 2.0
+            )
+
+
+def corioles_and_centrifugal_force(state):
+    #
+    # coriolis and centrifugal force
+    #
+    const = state.const
+    array = state.array
+    for k in range(1, const.NK + 1):
+        for j in range(1, const.NJ + 1):
+            array.acx[j, k, :] = (
+                array.f[k] + array.uw[j, k, :] * array.sn[k] / array.cs[k] / const.RE
+            ) * array.v[j, k, :]
+            array.acy[j, k, :] = (
+                -(array.f[k] + array.uw[j, k, :] * array.sn[k] / array.cs[k] / const.RE)
+                * array.u[j, k, :]
+            )
+
+
+def div_zonal_impulse(state):
+    #
+    # zonal divergence of momentum
+    #
+    const = state.const
+    array = state.array
+    for k in range(1, const.NK + 1):
+        for j in range(1, const.NJ + 1):
+            array.du[j, k, :] = (
+                (
+                    (array.u[j + 1, k, :] + array.u[j, k, :])
+                    * (array.uw[j + 1, k, :] + array.uw[j, k, :])
+                    - (array.u[j, k, :] + array.u[j - 1, k, :])
+                    * (array.uw[j, k, :] + array.uw[j - 1, k, :])
+                )
+                / 4.0
+                / array.dx[k]
+            )
+            +(
+                (
+                    array.v[j, k + 1, :] * array.cs[k + 1]
+                    + array.v[j, k, :] * array.cs[k]
+                )
+                * (array.uw[j, k + 1, :] + array.uw[j, k, :])
+                - (
+                    array.v[j, k, :] * array.cs[k]
+                    + array.v[j, k - 1, :] * array.cs[k - 1]
+                )
+                * (array.uw[j, k, :] + array.uw[j, k - 1, :])
+            ) / 4.0 / array.dy / array.cs[k]
+
+
+def div_meridional_impulse(state):
+    #
+    # meridional divergence of momentum
+    #
+    const = state.const
+    array = state.array
+    for k in range(1, const.NK + 1):
+        for j in range(1, const.NJ + 1):
+            array.dv[j, k, :] = (
+                (
+                    (array.u[j + 1, k, :] + array.u[j, k, :])
+                    * (array.vw[j + 1, k, :] + array.vw[j, k, :])
+                    - (array.u[j, k, :] + array.u[j - 1, k, :])
+                    * (array.vw[j, k, :] + array.vw[j - 1, k, :])
+                )
+                / 4.0
+                / array.dx[k]
+            )
+            +(
+                (
+                    array.v[j, k + 1, :] * array.cs[k + 1]
+                    + array.v[j, k, :] * array.cs[k]
+                )
+                * (array.vw[j, k + 1, :] + array.vw[j, k, :])
+                - (
+                    array.v[j, k, :] * array.cs[k]
+                    + array.v[j, k - 1, :] * array.cs[k - 1]
+                )
+                * (array.vw[j, k, :] + array.vw[j, k - 1, :])
+            ) / 4.0 / array.dy / array.cs[k]
+
+
+def div_temperature_flow(state):
+    #
+    # divergence of temperature flow
+    #
+    const = state.const
+    array = state.array
+    for k in range(1, const.NK + 1):
+        for j in range(1, const.NJ + 1):
+            array.dvt[j, k, :] = (
+                (
+                    (array.u[j + 1, k, :] + array.u[j, k, :])
+                    * (array.tw[j + 1, k, :] + array.tw[j, k, :])
+                    - (array.u[j, k, :] + array.u[j - 1, k, :])
+                    * (array.tw[j, k, :] + array.tw[j - 1, k, :])
+                )
+                / 4.0
+                / array.dx[k]
+            )
+            +(
+                (
+                    array.v[j, k + 1, :] * array.cs[k + 1]
+                    + array.v[j, k, :] * array.cs[k]
+                )
+                * (array.tw[j, k + 1, :] + array.tw[j, k, :])
+                - (
+                    array.v[j, k, :] * array.cs[k]
+                    + array.v[j, k - 1, :] * array.cs[k - 1]
+                )
+                * (array.tw[j, k, :] + array.tw[j, k - 1, :])
+            ) / 4.0 / array.dy / array.cs[k]
+
+
+def div_weighted_wind(state):
+    #
+    # divergence of mass-wighted wind
+    #
+    const = state.const
+    array = state.array
+    for k in range(1, const.NK + 1):
+        for j in range(1, const.NJ + 1):
+            array.d[j, k, :] = (
+                array.u[j + 1, k, :] - array.u[j - 1, k, :]
+            ) / 2.0 / array.dx[k] + (
+                array.v[j, k + 1, :] * array.cs[k + 1]
+                - array.v[j, k - 1, :] * array.cs[k - 1]
+            ) / array.cs[
+                k
+            ] / array.dy / 2.0
+
+
+def sigma_flow(state):
+    #
+    # divergence of mass flow between SIGMA=0 and SIGMA=SIGMA[l]
+    #
+    const = state.const
+    array = state.array
+    scalar = state.scalar
+    array.dm[:, :, 1] = array.d[:, :, 1] * scalar.dsig
+    for l in range(2, const.NL):
+        array.dm[:, :, l] = array.dm[:, :, l - 1] + array.d[:, :, l] * scalar.dsig
+
+
+# maybe index error
+def vert_speed_sigma(state):
+    #
+    # calculation of vertial velocity in SIGMA system
+    #
+    const = state.const
+    array = state.array
+    for l in range(0, const.NL - 2):
+        array.dsdt[1 : const.NJ + 1, 1 : const.NK + 1, l] = (
+            array.sigma[l]
+            / array.psg[1 : const.NJ + 1, 1 : const.NK + 1]
+            * array.dm[1 : const.NJ + 1, 1 : const.NK + 1, const.NL - 1]
+            - array.dm[1 : const.NJ + 1, 1 : const.NK + 1, l]
+            / array.psg[1 : const.NJ + 1, 1 : const.NK + 1]
+        )
+
+
+def adiabatic_heating(state):
+    #
+    # calculation of adiabatic compression heat
+    #
+    const = state.const
+    array = state.array
+    scalar = state.scalar
+    for k in range(1, const.NK + 1):
+        for j in range(1, const.NJ + 1):
+            array.comp[j, k, :] = (
+                const.FKAP
+                * (array.tw[j, k, :] + const.T0)
+                * (
+                    array.uw[j, k, :]
+                    * (array.ps[j + 1, k] - array.ps[j - 1, k])
+                    / array.dx[k]
+                    / 2.0
+                    + array.vw[j, k, :]
+                    * (array.ps[j, k + 1] - array.ps[j, k - 1])
+                    / array.dy
+                    / 2.0
+                )
+            )
+
+    array.comp[1 : const.NJ + 1, 1 : const.NK + 1, 0] = (
+        array.comp[1 : const.NJ + 1, 1 : const.NK + 1, 0]
+        - const.FKAP
+        * (array.tw[1 : const.NJ + 1, 1 : const.NK + 1, 1] + const.T0)
+        * array.alp[1]
+        * array.d[1 : const.NJ + 1, 1 : const.NK + 1, 1]
+    )
+    for l in range(1, const.NL):
+        array.comp[1 : const.NJ + 1, 1 : const.NK + 1, l] = array.comp[
+            1 : const.NJ + 1, 1 : const.NK + 1, l
+        ] - const.FKAP * (
+            array.tw[1 : const.NJ + 1, 1 : const.NK + 1, l] + const.T0
+        ) * (
+            array.alp[l] * array.d[1 : const.NJ + 1, 1 : const.NK + 1, l]
+            + (array.alp[l] + array.alp[l - 1])
+            * array.dm[1 : const.NJ + 1, 1 : const.NK + 1, l - 1]
+            / scalar.dsig
+        )
+
+
+def div_vert_advection(state):
+    #
+    # calculation of divergence of vertical advective flow
+    #
+    const = state.const
+    array = state.array
+    scalar = state.scalar
+    for l in range(0, const.NL - 1):
+        lp = l + 1
+        lm = l - 1
+        if lp > const.NL:
+            lp = const.NL
+        if lm < 1:
+            lm = 1
+        array.vdivu[1 : const.NJ + 1, 1 : const.NK + 1, l] = (
+            array.dsdt[1 : const.NJ + 1, 1 : const.NK + 1, l]
+            * (
+                array.u[1 : const.NJ + 1, 1 : const.NK + 1, lp]
+                + array.u[1 : const.NJ + 1, 1 : const.NK + 1, l]
+            )
+            / 2.0
+            - array.dsdt[1 : const.NJ + 1, 1 : const.NK + 1, l - 1]
+            * (
+                array.u[1 : const.NJ + 1, 1 : const.NK + 1, l]
+                + array.u[1 : const.NJ + 1, 1 : const.NK + 1, lm]
+            )
+            / 2.0
+        ) / scalar.dsig
+        array.vdivv[1 : const.NJ + 1, 1 : const.NK + 1, l] = (
+            array.dsdt[1 : const.NJ + 1, 1 : const.NK + 1, l]
+            * (
+                array.v[1 : const.NJ + 1, 1 : const.NK + 1, lp]
+                + array.v[1 : const.NJ + 1, 1 : const.NK + 1, l]
+            )
+            / 2.0
+            - array.dsdt[1 : const.NJ + 1, 1 : const.NK + 1, l - 1]
+            * (
+                array.v[1 : const.NJ + 1, 1 : const.NK + 1, l]
+                + array.v[1 : const.NJ + 1, 1 : const.NK + 1, lm]
+            )
+            / 2.0
+        ) / scalar.dsig
+        array.vdivt[1 : const.NJ + 1, 1 : const.NK + 1, l] = (
+            array.dsdt[1 : const.NJ + 1, 1 : const.NK + 1, l]
+            * (
+                array.t[1 : const.NJ + 1, 1 : const.NK + 1, lp]
+                + array.t[1 : const.NJ + 1, 1 : const.NK + 1, l]
+            )
+            / 2.0
+            - array.dsdt[1 : const.NJ + 1, 1 : const.NK + 1, l - 1]
+            * (
+                array.t[1 : const.NJ + 1, 1 : const.NK + 1, l]
+                + array.t[1 : const.NJ + 1, 1 : const.NK + 1, lm]
+            )
+            / 2.0
+        ) / scalar.dsig
+
+
+def summarize_trends(state):
+    #
+    # summarize trends
+    #
+    const = state.const
+    array = state.array
+    for k in range(1, const.NK + 1):
+        for j in range(1, const.NJ + 1):
+            array.ut[j, k, :] = (
+                array.acx[j, k, :]
+                + array.apx[j, k, :]
+                - array.du[j, k, :]
+                - array.vdivu[j, k, :]
+                + array.diffu[j, k, :]
+            )
+            array.vt[j, k, :] = (
+                array.acy[j, k, :]
+                + array.apy[j, k, :]
+                - array.dv[j, k, :]
+                - array.vdivv[j, k, :]
+                + array.diffv[j, k, :]
+            )
+            array.tt[j, k, :] = (
+                -array.dvt[j, k, :]
+                + array.comp[j, k, :]
+                - array.vdivt[j, k, :]
+                + array.difft[j, k, :]
+            )
+            array.pst[j, k] = -array.dm[j, k, const.NL - 1]
+
+
+#############################################################
+
+
+def trend(state):
+    true_wind_and_abs_ps(state)
+    geopential(state)
+    zonal_pressure_gradient_force(state)
+    meridional_pressure_gradient_force(state)
+    corioles_and_centrifugal_force(state)
+    div_zonal_impulse(state)
+    div_meridional_impulse(state)
+    div_temperature_flow(state)
+    div_weighted_wind(state)
+    sigma_flow(state)
+    vert_speed_sigma(state)
+    adiabatic_heating(state)
+    div_vert_advection(state)
+    summarize_trends(state)
@@ -1,5 +1,7 @@
+import copy
 import numpy as np
-from .constants import global_const
+from .constants import GLOBAL_CONST
+from .profiling import PROFILE
 
 #
 # string variables
@@ -10,8 +12,7 @@ class GLOBAL_STR:
     # cday = "30"  # day
     # chour = "00"  # hour
     # cmin = "00"  # minute
-    
-global_str = GLOBAL_STR()
+
 
 #
 # integer variables
@@ -33,140 +34,188 @@ class GLOBAL_INT:
     dy = np.nan
     dsig = np.nan
     ntout = 0  # model output step
+    nsteps = 0  # time steps taken by the run (after its restart file)
+
 
-global_int = GLOBAL_INT()
 #
 # arrays
 #
+DIAGNOSTICS = [  # terms of the trends, only allocated without LEAN
+    "dsdt", "comp", "apx", "apy", "acx", "acy", "du", "dv", "dvt",
+    "vdivu", "vdivv", "vdivt", "diffu", "diffv", "difft",
+]
+
+
 class GLOBAL_ARRAY:
+    def __init__(self, const, members=None):
+        NJ = const.NJ
+        NK = const.NK
+        NL = const.NL
+        lead = [] if members is None else [members]  # ensemble dimension
+        dtype = np.dtype(const.DTYPE)  # of the 2D/3D arrays and the metric
+        if dtype not in (np.float32, np.float64):
+            raise ValueError("DTYPE must be float32 or float64, not " + str(dtype))
+        if const.LAYOUT not in ("column", "level"):
+            raise ValueError(
+                'LAYOUT must be "column" or "level", not ' + repr(const.LAYOUT)
+            )
+
+        def zeros(*shape):
+            #
+            # 2D/3D array indexed (lon, lat[, level]). The "column" layout
+            # stores the levels of a grid point next to each other, the
+            # "level" layout stores contiguous (lat, lon) planes per level,
+            # as a transposed view of a (level, lat, lon) array.
+            #
+            if const.LAYOUT == "column":
+                return np.zeros([*lead, *shape], dtype=dtype)
+            planes = np.zeros([*lead, *shape[::-1]], dtype=dtype)
+            axes = range(len(lead), planes.ndim)
+            return np.moveaxis(planes, axes, axes[::-1])
+
+        #
+        # 1D arrays
+        #
+        self.flam_deg = np.full(NJ + 2, np.nan)  # longitude of grid points (deg)
+        self.phi_deg = np.full(NK + 2, np.nan)  # latitude of grid points (deg)
+        self.flam = np.full(NJ + 2, np.nan)  # longitude of grid points (rad)
+        self.phi = np.full(NK + 2, np.nan)  # latitude of grid points (rad)
+        self.dx = np.full(NK + 2, np.nan, dtype=dtype)  # zonal grid point distance (metric)
+        self.cs = np.full(NK + 2, np.nan, dtype=dtype)  # cosinus latitude
+        self.sn = np.full(NK + 2, np.nan, dtype=dtype)  # sinus latitude
+        self.f = np.full(NK + 2, np.nan, dtype=dtype)  # coriolis parameter
+        self.sigma = np.full(NL + 1, np.nan, dtype=dtype)  # SIGMA on full levels
+        self.sigmah = np.full(NL, np.nan)  # SIGMA on half levels
+        self.alp = np.full(NL, np.nan, dtype=dtype)  # height dependent coeffizient alpha
+        self.gp0 = np.full(NL, np.nan)  # reference geopotential
+        self.joppos = np.zeros(NJ + 1, dtype=int)  # longitude opposite the pole
+        self.rdx2 = np.full(NK + 2, np.nan, dtype=dtype)  # 1 / (2 dx)
+        self.rdx4 = np.full(NK + 2, np.nan, dtype=dtype)  # 1 / (4 dx)
+        self.rcsdy2 = np.full(NK + 2, np.nan, dtype=dtype)  # 1 / (2 cs dy)
+        self.fcen = np.full(NK + 2, np.nan, dtype=dtype)  # sn / cs / RE
+        self.rdalp = np.full(NL, np.nan, dtype=dtype)  # RD alpha
+        self.ralps = np.full(NL, np.nan, dtype=dtype)  # (alpha[l] + alpha[l-1]) / dsig
+        #
+        # 2d arrays
+        #
+        self.ps = zeros(NJ + 2, NK + 2)  # surfance pressure anomaly
+        self.psn = zeros(NJ + 2, NK + 2)  # ps future
+        self.psg = zeros(NJ + 2, NK + 2)  # absolute surface pressure
+        self.phis = zeros(NJ + 2, NK + 2)  # geopotential at surface (orography)
+        #
+        # 3d arrays with boundary conditions
+        #
+        self.u = zeros(NJ + 2, NK + 2, NL)  # mass-weighted zonal wind
+        self.v = zeros(NJ + 2, NK + 2, NL)  # mass-weighted meridional wind
+        self.t = zeros(NJ + 2, NK + 2, NL)  # mass-weighted temperature
+        self.un = zeros(NJ + 2, NK + 2, NL)  # U future
+        self.vn = zeros(NJ + 2, NK + 2, NL)  # V future
+        self.tn = zeros(NJ + 2, NK + 2, NL)  # T future
+        self.psa = zeros(NJ + 2, NK + 2)  # ps past
+        self.ua = zeros(NJ + 2, NK + 2, NL)  # U past
+        self.va = zeros(NJ + 2, NK + 2, NL)  # V past
+        self.ta = zeros(NJ + 2, NK + 2, NL)  # T past
+        self.uw = zeros(NJ + 2, NK + 2, NL)  # true zonal wind
+        self.vw = zeros(NJ + 2, NK + 2, NL)  # true meridional wind
+        self.tw = zeros(NJ + 2, NK + 2, NL)  # true temperature
+        self.gp = zeros(NJ + 2, NK + 2, NL)  # geopotential
+        #
+        # trends, in lean mode the future time level is used as storage
+        #
+        self.lean = const.LEAN
+        if self.lean:
+            self.pst, self.ut, self.vt, self.tt = self.psn, self.un, self.vn, self.tn
+        else:
+            self.pst = zeros(NJ + 2, NK + 2)  # Trend ps
+            self.ut = zeros(NJ + 2, NK + 2, NL)  # trend U
+            self.vt = zeros(NJ + 2, NK + 2, NL)  # trend V
+            self.tt = zeros(NJ + 2, NK + 2, NL)  # trend T
+        self.d = zeros(NJ + 2, NK + 2, NL)  # divergence of mass-weighted wind
+        self.dm = zeros(NJ + 2, NK + 2, NL)  # divergence of mass flow
+        #
+        # terms of the trends, in lean mode they are summed up in the trends
+        # directly and not stored
+        #
+        for name in DIAGNOSTICS:
+            setattr(self, name, None)
+        self.scratch = None
+        if self.lean:
+            # one working field of the compression heat and vertical velocity
+            self.scratch = zeros(NJ + 2, NK + 2, NL)
+        else:
+            self.dsdt = zeros(NJ + 2, NK + 2, NL)  # SIGMA vertical velocity
+            self.comp = zeros(NJ + 2, NK + 2, NL)  # adiabatic compression heat
+            self.apx = zeros(NJ + 2, NK + 2, NL)  # zonal pressure gradient
+            self.apy = zeros(NJ + 2, NK + 2, NL)  # meridional pressure gradient
+            self.acx = zeros(NJ + 2, NK + 2, NL)  # zonal coriolis force
+            self.acy = zeros(NJ + 2, NK + 2, NL)  # meridional coriolis force
+            self.du = zeros(NJ + 2, NK + 2, NL)  # zonal divergence of momentum
+            self.dv = zeros(NJ + 2, NK + 2, NL)  # meridional divergence of momentum
+            self.dvt = zeros(NJ + 2, NK + 2, NL)  # divergence of temperature flow
+            self.vdivu = zeros(NJ + 2, NK + 2, NL)  # divergence of vertiacl U-flow
+            self.vdivv = zeros(NJ + 2, NK + 2, NL)  # divergence of vertiacl V-flow
+            self.vdivt = zeros(NJ + 2, NK + 2, NL)  # divergence of vertiacl T-flow
+            self.diffu = zeros(NJ + 2, NK + 2, NL)  # diffusion of zonal momentum
+            self.diffv = zeros(NJ + 2, NK + 2, NL)  # diffusion of meridional momentum
+            self.difft = zeros(NJ + 2, NK + 2, NL)  # diffuson of temperature
+
     #
-    # 1D arrays
-    #
-    flam_deg = np.full(global_const.NJ + 2, np.nan)  # longitude of grid points (deg)
-    phi_deg = np.full(global_const.NK + 2, np.nan)  # latitude of grid points (deg)
-    flam = np.full(global_const.NJ + 2, np.nan)  # longitude of grid points (rad)
-    phi = np.full(global_const.NK + 2, np.nan)  # latitude of grid points (rad)
-    dx = np.full(global_const.NK + 2, np.nan)  # zonal grid point distance (metric)
-    cs = np.full(global_const.NK + 2, np.nan)  # cosinus latitude
-    sn = np.full(global_const.NK + 2, np.nan)  # sinus latitude
-    f = np.full(global_const.NK + 2, np.nan)  # coriolis parameter
-    sigma = np.full(global_const.NL + 1, np.nan)  # SIGMA on full levels
-    sigmah = np.full(global_const.NL, np.nan)  # SIGMA on half levels
-    alp = np.full(global_const.NL, np.nan)  # height dependent coeffizient alpha
-    gp0 = np.full(global_const.NL, np.nan)  # reference geopotential
-    #
-    # 2d arrays
+    # time levels: (ps, u, v, t) is the current level, (psa, ua, va, ta) the
+    # past and (psn, un, vn, tn) the future one. The three levels form a ring
+    # buffer, advancing the model time only rotates the references.
     #
-    ps = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2]
-    )  # surfance pressure anomaly
-    psn = np.zeros([global_const.NJ + 2, global_const.NK + 2])  # ps future
-    pst = np.zeros([global_const.NJ + 2, global_const.NK + 2])  # Trend ps
-    psg = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2]
-    )  # absolute surface pressure
-    phis = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2]
-    )  # geopotential at surface (orography)
+    def advance_time_levels(self):
+        self.psa, self.ps, self.psn = self.ps, self.psn, self.psa
+        self.ua, self.u, self.un = self.u, self.un, self.ua
+        self.va, self.v, self.vn = self.v, self.vn, self.va
+        self.ta, self.t, self.tn = self.t, self.tn, self.ta
+        if self.lean:
+            self.pst, self.ut, self.vt, self.tt = self.psn, self.un, self.vn, self.tn
+
+
+#
+# model state
+#
+class ModelState:
     #
-    # 3d arrays with boundary conditions
+    # complete state of one model run, allocated from its configuration.
+    # With a number of ensemble members, all 2D and 3D arrays get a leading
+    # member dimension and the members are integrated together.
     #
-    u = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # mass-weighted zonal wind
-    v = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # mass-weighted meridional wind
-    t = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # mass-weighted temperature
-    un = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # U future
-    vn = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # V future
-    tn = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # T future
-    psa = np.zeros([global_const.NJ + 2, global_const.NK + 2])  # ps past
-    ua = np.zeros([global_const.NJ + 2, global_const.NK + 2, global_const.NL])  # U past
-    va = np.zeros([global_const.NJ + 2, global_const.NK + 2, global_const.NL])  # V past
-    ta = np.zeros([global_const.NJ + 2, global_const.NK + 2, global_const.NL])  # T past
-    ut = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # trend U
-    vt = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # trend V
-    tt = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # trend T
-    uw = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # true zonal wind
-    vw = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # true meridional wind
-    tw = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # true temperature
-    gp = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # geopotential
-    ###########################
-    # 3d arrays without boundary condiitons (index 0, NK +1 and NJ +1 are left empty)
-    ###########################
-    dsdt = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # SIGMA vertical velocity
-    comp = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # adiabatic compression heat
-    apx = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # zonal pressure gradient
-    apy = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # meridional pressure gradient
-    acx = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # zonal coriolis force
-    acy = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # meridional coriolis force
-    d = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # divergence of mass-weighted wind
-    dm = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # divergence of mass flow
-    du = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # zonal divergence of momentum
-    dv = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # meridional divergence of momentum
-    dvt = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # divergence of temperature flow
-    vdivu = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # divergence of vertiacl U-flow
-    vdivv = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # divergence of vertiacl V-flow
-    vdivt = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # divergence of vertiacl T-flow
-    diffu = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # diffusion of zonal momentum
-    diffv = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # diffusion of meridional momentum
-    difft = np.zeros(
-        [global_const.NJ + 2, global_const.NK + 2, global_const.NL]
-    )  # diffuson of temperature
+    def __init__(self, const=None, members=None):
+        self.const = GLOBAL_CONST() if const is None else const
+        self.members = members
+        self.string = GLOBAL_STR()
+        self.scalar = GLOBAL_INT()
+        self.array = GLOBAL_ARRAY(self.const, members)
+        self.out = None  # netCDF output, opened by output.init_output
+        self.out_buffer = None  # output frames not yet written
+        self.out_writer = None  # background output thread, if any
+        self.implicit = None  # Helmholtz solver of SCHEME="semi-implicit"
+        self.polar = None  # latitude rows and damping factors of POLAR
+        # kernel timings of a profiled run
+        self.profile = None if self.const.profile_path is None else PROFILE()
+
+    def member(self, m):
+        #
+        # view of ensemble member m as a single model state, its arrays share
+        # their memory with the ensemble
+        #
+        state = copy.copy(self)
+        state.members = None
+        state.const = copy.copy(self.const)
+        if self.const.SEED is not None:
+            state.const.SEED = self.const.SEED + m
+        state.array = copy.copy(self.array)
+        for name, value in vars(self.array).items():
+            if isinstance(value, np.ndarray) and value.ndim >= 3:
+                setattr(state.array, name, value[m])
+        return state
 
-global_array = GLOBAL_ARRAY()
\ No newline at end of file
+    def member_states(self):
+        #
+        # the state itself, or the views of all its ensemble members
+        #
+        if self.members is None:
+            return [self]
+        return [self.member(m) for m in range(self.members)]
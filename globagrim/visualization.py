@@ -5,9 +5,7 @@ import numpy as np
 import xarray as xr
 
 
-def plot(var_name, time_step, center, min_max, save):
-    from .variables import global_const
-
+def plot(path, var_name, time_step, center, min_max, save, member=0):
     var_set = {"PSG": "jet", "SE": "terrain", "T": "cool", "U": "PiYG", "V": "PiYG"}
     
     if min_max == None:
@@ -16,7 +14,11 @@ def plot(var_name, time_step, center, min_max, save):
         levels=np.linspace(min_max[0], min_max[1], 10)
         
     # open data set
-    ds = xr.open_dataset(global_const.output_path)
+    ds = xr.open_dataset(path)
+
+    # select ensemble member
+    if "ensemble" in ds.dims:
+        ds = ds.isel(ensemble=member)
 
     # open var
     if len(ds[var_name].dims) == 2:
@@ -0,0 +1,45 @@
+import numpy as np
+
+from globagrim import boundary_conditions, grid
+from globagrim.constants import GLOBAL_CONST
+from globagrim.variables import ModelState
+
+
+def _state():
+    state = ModelState(GLOBAL_CONST(NJ=24, NK=12, NL=4))
+    grid.grid(state)
+    return state
+
+
+def _loop_boundary_conditions(a, sign, NJ, NK):
+    for j in range(0, NJ + 1):
+        joppos = j + int(NJ / 2)
+        if joppos > NJ:
+            joppos = joppos - NJ
+        a[j, 0] = sign * a[joppos, 1]
+        a[j, NK + 1] = sign * a[joppos, NK]
+    for k in range(0, NK + 2):
+        a[0, k] = a[NJ, k]
+        a[NJ + 1, k] = a[1, k]
+
+
+def test_boundary_conditions_match_pointwise_copy():
+    rng = np.random.default_rng(1)
+    state = _state()
+    expected = {}
+    for name, sign in [("ps", 1), ("phis", 1), ("u", -1), ("v", -1), ("t", 1)]:
+        a = getattr(state.array, name)
+        a[:] = rng.standard_normal(a.shape)
+        expected[name] = a.copy()
+        _loop_boundary_conditions(expected[name], sign, state.const.NJ, state.const.NK)
+    boundary_conditions.boundary_conditions(state)
+    for name, a in expected.items():
+        np.testing.assert_array_equal(getattr(state.array, name), a, err_msg=name)
+
+
+def test_boundary_conditions_can_skip_orography():
+    state = _state()
+    state.array.phis[:] = 1.0
+    state.array.phis[1:-1, 1:-1] = 2.0
+    boundary_conditions.boundary_conditions(state, static=False)
+    assert state.array.phis[0, 5] == 1.0
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from globagrim import golden
+
+GOLDEN = os.path.join(os.path.dirname(__file__), "golden")
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        dict(BACKEND="numpy"),
+        dict(BACKEND="numpy", NTHREADS=3),
+        dict(BACKEND="numba"),
+        dict(BACKEND="numba", NTHREADS=3),
+    ],
+)
+def test_backends_reproduce_golden_output(config):
+    if config["BACKEND"] == "numba":
+        pytest.importorskip("numba")
+    records = golden.compare(GOLDEN, **config)
+    assert all(record["passed"] for record in records), golden.report(records)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+@pytest.mark.parametrize("acc64", [True, False])
+def test_float32_stays_close_to_golden_output(backend, acc64):
+    if backend == "numba":
+        pytest.importorskip("numba")
+    records = golden.compare(
+        GOLDEN, golden.FLOAT32_TOLERANCES, BACKEND=backend, DTYPE="float32", ACC64=acc64
+    )
+    assert all(record["passed"] for record in records), golden.report(records)
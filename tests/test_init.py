@@ -0,0 +1,34 @@
+import numpy as np
+
+from globagrim import grid, init
+from globagrim.constants import GLOBAL_CONST
+from globagrim.variables import ModelState
+
+
+def _state(iexp):
+    state = ModelState(GLOBAL_CONST(IEXP=iexp, NJ=36, NK=18, NL=3))
+    grid.grid(state)
+    return state
+
+
+def test_montain_flow_matches_point_formula():
+    state = _state(2)
+    init.init_case(state)
+    const, array = state.const, state.array
+    j, k = 27, 12  # inside the mountain
+    dist = np.sqrt(
+        (array.flam[j] - 1.5 * const.pi) ** 2 + (array.phi[k] - const.pi / 6) ** 2
+    )
+    assert array.phis[j, k] == const.G * 2000.0 * (1.0 - dist / (const.pi / 9))
+    assert np.all(
+        array.t[j, k, :] == (array.ps[j, k] + const.PS0) * (1.0 - dist / (const.pi / 9))
+    )
+    assert np.all(array.phis[1:6, 1:6] == 0.0)
+
+
+def test_registered_case_is_used(monkeypatch):
+    monkeypatch.setitem(init.CASES, 99, lambda state: state.array.ps.fill(1.0))
+    state = _state(99)
+    init.init_case(state)
+    assert np.all(state.array.ps == 1.0)
+    assert set(init.CASES) >= {1, 2, 3}
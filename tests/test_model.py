@@ -0,0 +1,184 @@
+import json
+import subprocess
+import sys
+import threading
+
+import netCDF4
+import numpy as np
+import pytest
+
+from globagrim import grid, model, output
+from globagrim.variables import ModelState
+
+
+def test_run_uses_configured_resolution_and_time_steps(tmp_path):
+    out = tmp_path / "out.nc"
+    state = model.run(NJ=24, NK=12, NL=4, DT=60.0, TF=0.1, OUT=str(out))
+    assert state.array.u.shape == (26, 14, 4)
+    with netCDF4.Dataset(out) as ds:
+        assert ds["T"].shape == (7, 4, 12, 24)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba", "reference"])
+def test_ensemble_members_match_single_runs(tmp_path, backend):
+    if backend == "numba":
+        pytest.importorskip("numba")
+    config = dict(NJ=16, NK=8, NL=4, DT=60.0, TF=0.05, IEXP=3, SEED=7, BACKEND=backend)
+    ens = model.ensemble(MEMBERS=3, OUT=str(tmp_path / "ens.nc"), **config)
+    for m in range(3):
+        config["SEED"] = 7 + m
+        single = model.run(OUT=str(tmp_path / "single.nc"), **config)
+        for name in ["ps", "u", "v", "t"]:
+            np.testing.assert_array_equal(
+                getattr(ens.array, name)[m], getattr(single.array, name)
+            )
+    with netCDF4.Dataset(tmp_path / "ens.nc") as ds:
+        assert ds["T"].dimensions == ("time", "ensemble", "level", "lat", "lon")
+        assert ds["T"].shape == (4, 3, 4, 8, 16)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_level_layout_matches_column_layout(tmp_path, backend):
+    if backend == "numba":
+        pytest.importorskip("numba")
+    config = dict(NJ=16, NK=8, NL=4, DT=60.0, TF=0.05, IEXP=3, SEED=2, BACKEND=backend)
+    column = model.ensemble(MEMBERS=2, OUT=str(tmp_path / "column.nc"), **config)
+    level = model.ensemble(
+        MEMBERS=2, LAYOUT="level", OUT=str(tmp_path / "level.nc"), **config
+    )
+    assert level.array.u.shape == column.array.u.shape
+    assert level.array.u[0].T.flags.c_contiguous
+    for name in ["ps", "u", "v", "t"]:
+        np.testing.assert_array_equal(
+            getattr(level.array, name), getattr(column.array, name)
+        )
+    with netCDF4.Dataset(tmp_path / "column.nc") as a, netCDF4.Dataset(
+        tmp_path / "level.nc"
+    ) as b:
+        for name in ["PSG", "T", "U", "V"]:
+            np.testing.assert_array_equal(b[name][:], a[name][:], err_msg=name)
+
+
+def test_sweep_writes_one_output_per_configuration_and_a_manifest(tmp_path):
+    configurations = [
+        dict(NJ=16, NK=8, NL=4, DT=60.0, TF=0.05),
+        dict(NJ=24, NK=12, NL=3, DT=30.0, TF=0.05, IEXP=2),
+        dict(NJ=16, NK=8, NL=4, BACKEND="unknown"),
+    ]
+    manifest = model.sweep(configurations, DIR=str(tmp_path), PROCESSES=2)
+    with open(tmp_path / "manifest.json") as f:
+        assert json.load(f) == manifest
+    ok, other, failed = manifest["runs"]
+    assert ok["status"] == "ok" and ok["steps"] == 3
+    assert other["status"] == "ok" and other["steps"] == 6
+    assert failed["status"] == "failed"
+    with netCDF4.Dataset(other["output"]) as ds:
+        assert ds["T"].shape == (7, 3, 12, 24)
+
+
+@pytest.mark.parametrize("queue", [0, 1])
+def test_buffered_output_matches_unbuffered(tmp_path, queue):
+    config = dict(NJ=16, NK=8, NL=4, DT=60.0, TF=0.1, IEXP=3, SEED=1)
+    model.run(BUF=1, QUEUE=0, OUT=str(tmp_path / "single.nc"), **config)
+    model.run(BUF=4, QUEUE=queue, OUT=str(tmp_path / "buffered.nc"), **config)
+    with netCDF4.Dataset(tmp_path / "single.nc") as a, netCDF4.Dataset(
+        tmp_path / "buffered.nc"
+    ) as b:
+        assert b["T"].chunking() == [4, 4, 8, 16]
+        for name in ["time", "SE", "PSG", "T", "U", "V"]:
+            assert b[name].shape == a[name].shape
+            np.testing.assert_array_equal(b[name][:], a[name][:], err_msg=name)
+
+
+def test_compressed_output_with_selected_variables(tmp_path):
+    config = dict(NJ=16, NK=8, NL=4, DT=60.0, TF=0.1, IEXP=3, SEED=1)
+    model.run(OUT=str(tmp_path / "plain.nc"), **config)
+    model.run(
+        VARS=["PSG", "T"],
+        ZLIB=True,
+        LSD={"T": 2},
+        CHUNKS="time",
+        OUT=str(tmp_path / "compressed.nc"),
+        **config,
+    )
+    with netCDF4.Dataset(tmp_path / "plain.nc") as a, netCDF4.Dataset(
+        tmp_path / "compressed.nc"
+    ) as b:
+        assert "U" not in b.variables and "SE" not in b.variables
+        assert b["T"].filters()["zlib"]
+        assert b["T"].chunking() == [7, 1, 8, 16]
+        np.testing.assert_array_equal(b["PSG"][:], a["PSG"][:])
+        np.testing.assert_allclose(b["T"][:], a["T"][:], rtol=0, atol=0.005)
+
+
+def test_time_chunks_are_capped_and_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(output, "TIME_CHUNK", 4)
+    config = dict(NJ=16, NK=8, NL=4, DT=60.0, TF=0.2, BUF=3, IEXP=3, SEED=1)
+    model.run(OUT=str(tmp_path / "plain.nc"), **config)
+    state = ModelState(
+        model._configuration(
+            dict(CHUNKS="time", OUT=str(tmp_path / "cache.nc"), **config)
+        )
+    )
+    grid.grid(state)
+    output.init_output(state)
+    assert state.out["T"].get_var_chunk_cache()[0] == 4 * 4 * 8 * 16 * 4
+    output.close(state)
+    model.run(CHUNKS="time", OUT=str(tmp_path / "time.nc"), **config)
+    with netCDF4.Dataset(tmp_path / "plain.nc") as a, netCDF4.Dataset(
+        tmp_path / "time.nc"
+    ) as b:
+        assert b["T"].chunking() == [4, 1, 8, 16]
+        for name in ["PSG", "T", "U", "V"]:
+            np.testing.assert_array_equal(b[name][:], a[name][:], err_msg=name)
+
+
+def test_restart_continues_run_bit_identical(tmp_path):
+    config = dict(NJ=16, NK=8, NL=4, DT=60.0, IEXP=3, SEED=1)
+    full = model.run(TF=0.1, OUT=str(tmp_path / "full.nc"), **config)
+    restart = str(tmp_path / "restart.npz")
+    out = str(tmp_path / "restarted.nc")
+    model.run(TF=0.05, RINT=0.05, ROUT=restart, OUT=out, **config)
+    resumed = model.run(TF=0.1, RESTART=restart, OUT=out, **config)
+    for name in ["ps", "u", "v", "t", "psa", "ua", "va", "ta"]:
+        np.testing.assert_array_equal(
+            getattr(resumed.array, name), getattr(full.array, name), err_msg=name
+        )
+    assert resumed.scalar.ti == full.scalar.ti
+    with netCDF4.Dataset(tmp_path / "full.nc") as a, netCDF4.Dataset(out) as b:
+        for name in ["time", "SE", "PSG", "T", "U", "V"]:
+            np.testing.assert_array_equal(b[name][:], a[name][:], err_msg=name)
+
+
+def test_failed_run_closes_its_output(tmp_path, monkeypatch):
+    from globagrim import boundary_conditions
+
+    apply = boundary_conditions.boundary_conditions
+    calls = []
+
+    def fail(state, static=True):
+        calls.append(static)
+        if len(calls) == 5:
+            raise FloatingPointError("test")
+        apply(state, static)
+
+    monkeypatch.setattr(boundary_conditions, "boundary_conditions", fail)
+    out = tmp_path / "out.nc"
+    with pytest.raises(FloatingPointError):
+        model.run(NJ=16, NK=8, NL=4, DT=60.0, TF=0.1, BUF=10, QUEUE=2, OUT=str(out))
+    assert not any(t.name == "globagrim-output" for t in threading.enumerate())
+    with netCDF4.Dataset(out) as ds:
+        assert ds["T"].shape[0] == 5  # initial conditions and 4 time steps
+
+
+def test_sweep_with_threads_after_a_threaded_run(tmp_path):
+    # the forked sweep workers must not reuse the thread pool of the parent,
+    # run in a subprocess so that a hang fails the test
+    script = (
+        "from globagrim import model\n"
+        "config = dict(NJ=16, NK=8, NL=4, DT=60.0, TF=0.05, NTHREADS=2, VERBOSE=0)\n"
+        "model.run(OUT=%r, **config)\n"
+        "manifest = model.sweep([config], DIR=%r, PROCESSES=1)\n"
+        "assert manifest['runs'][0]['status'] == 'ok'\n"
+    ) % (str(tmp_path / "run.nc"), str(tmp_path / "sweep"))
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=120)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from globagrim import grid, model, polar
+from globagrim.constants import GLOBAL_CONST
+from globagrim.variables import ModelState
+
+
+def test_polar_filter_damps_short_waves_poleward_of_the_latitude():
+    state = ModelState(GLOBAL_CONST(NJ=24, NK=12, NL=3, POLAR=60.0))
+    grid.grid(state)
+    array = state.array
+    rows, factor = state.polar
+    assert list(rows) == [1, 2, 11, 12]
+    rng = np.random.default_rng(0)
+    for name in ["pst", "ut", "vt", "tt"]:
+        getattr(array, name)[...] = rng.standard_normal(getattr(array, name).shape)
+    before = array.tt.copy()
+    polar.filter_trends(state)
+    np.testing.assert_array_equal(array.tt[:, 3:11], before[:, 3:11])
+    np.testing.assert_array_equal(array.tt[0], before[0])  # halo points
+    modes = np.fft.rfft(array.tt[1:-1, 1], axis=0)
+    np.testing.assert_allclose(
+        np.abs(modes), np.abs(np.fft.rfft(before[1:-1, 1], axis=0)) * factor[:, :1]
+    )
+    assert factor[0, 0] == 1.0
+    assert factor[6, 0] == pytest.approx(np.cos(np.radians(82.5)) / 0.5)
+
+
+def test_polar_filter_keeps_too_large_dt_stable(tmp_path):
+    config = dict(NJ=24, NK=12, NL=4, DT=1200.0, TF=24.0, IEXP=1, VERBOSE=0)
+    state = model.run(POLAR=60.0, OUT=str(tmp_path / "out.nc"), **config)
+    assert np.isfinite(state.array.ps).all()
+
+
+@pytest.mark.parametrize("nthreads", [1, 2])
+def test_polar_filter_of_ensemble_matches_single_runs(tmp_path, nthreads):
+    config = dict(
+        NJ=24, NK=12, NL=4, DT=600.0, TF=1.0, IEXP=3, POLAR=60.0, NTHREADS=nthreads
+    )
+    ens = model.ensemble(MEMBERS=2, SEED=5, OUT=str(tmp_path / "ens.nc"), **config)
+    for m in range(2):
+        single = model.run(SEED=5 + m, OUT=str(tmp_path / "single.nc"), **config)
+        for name in ["ps", "u", "v", "t"]:
+            np.testing.assert_allclose(
+                getattr(ens.array, name)[m], getattr(single.array, name), atol=1e-9
+            )
@@ -0,0 +1,37 @@
+import json
+
+from globagrim import model
+
+
+def test_profile_records_kernels_and_writes_json(tmp_path):
+    path = tmp_path / "profile.json"
+    state = model.run(
+        NJ=16, NK=8, NL=4, DT=60.0, TF=0.1, PROFILE=str(path), OUT=str(tmp_path / "out.nc")
+    )
+    with open(path) as f:
+        profile = json.load(f)
+    kernels = {record["kernel"]: record for record in profile["kernels"]}
+    assert kernels["trend"]["calls"] == 6
+    assert kernels["geopential"]["calls"] == 6
+    assert kernels["adiabatic_heating"]["calls"] == 6
+    assert kernels["boundary_conditions"]["calls"] == 5
+    assert kernels["write_snapshot"]["calls"] == 7
+    assert profile["wall_time"] == state.profile.wall_time > kernels["trend"]["time"]
+    assert "div_zonal_impulse" in state.profile.report()
+
+
+def test_run_without_profile_records_nothing(tmp_path):
+    state = model.run(NJ=16, NK=8, NL=4, DT=60.0, TF=0.05, OUT=str(tmp_path / "out.nc"))
+    assert state.profile is None
+
+
+def test_profile_of_a_restarted_run_counts_its_own_steps(tmp_path):
+    config = dict(NJ=16, NK=8, NL=4, DT=60.0, OUT=str(tmp_path / "out.nc"))
+    restart = str(tmp_path / "restart.npz")
+    model.run(TF=0.05, RINT=0.05, ROUT=restart, **config)
+    path = tmp_path / "profile.json"
+    model.run(TF=0.1, RESTART=restart, PROFILE=str(path), **config)
+    with open(path) as f:
+        profile = json.load(f)
+    kernels = {record["kernel"]: record for record in profile["kernels"]}
+    assert profile["steps"] == kernels["trend"]["calls"] == 3
@@ -0,0 +1,43 @@
+import logging
+
+from globagrim import model, progress
+
+
+def test_progress_records_are_throttled_and_structured(tmp_path, caplog):
+    caplog.set_level(logging.DEBUG, logger="globagrim")
+    config = dict(NJ=16, NK=8, NL=4, DT=60.0, TF=0.1, OUT=str(tmp_path / "out.nc"))
+
+    model.run(REPORT=0.0, **config)
+    progress = [r for r in caplog.records if hasattr(r, "steps_per_second")]
+    assert [r.step for r in progress] == list(range(6))
+    assert progress[-1].eta == 0.0
+    assert progress[-1].simulated_hours_per_wall_hour > 0.0
+    assert not [r for r in caplog.records if r.levelno == logging.DEBUG]
+
+    caplog.clear()
+    model.run(REPORT=3600.0, **config)
+    progress = [r for r in caplog.records if hasattr(r, "steps_per_second")]
+    assert [r.step for r in progress] == [5]  # only the last step
+
+    caplog.clear()
+    model.run(VERBOSE=0, **config)
+    assert not caplog.records
+
+
+def test_console_handler_follows_the_verbosity_of_each_run(
+    tmp_path, capsys, monkeypatch
+):
+    # without any logging configuration (pytest configures the root logger)
+    monkeypatch.setattr(logging.getLogger(), "handlers", [])
+    monkeypatch.setattr(progress, "_handler", None)
+    logger = logging.getLogger("globagrim")
+    monkeypatch.setattr(logger, "handlers", [])
+    monkeypatch.setattr(logger, "level", logging.NOTSET)
+    config = dict(NJ=16, NK=8, NL=4, DT=60.0, TF=0.1, OUT=str(tmp_path / "out.nc"))
+
+    model.run(**config)
+    assert "Model time step" not in capsys.readouterr().err
+    model.run(VERBOSE=2, **config)
+    assert "Model time step" in capsys.readouterr().err
+    model.run(**config)
+    assert "Model time step" not in capsys.readouterr().err
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from globagrim import grid, model, semi_implicit
+from globagrim.constants import GLOBAL_CONST
+from globagrim.variables import ModelState
+
+
+def _laplacian(state, p):
+    gx, gy = semi_implicit._gradient(state, semi_implicit._halo(state, p, 1))
+    return semi_implicit._divergence(
+        state, semi_implicit._halo(state, gx, -1), semi_implicit._halo(state, gy, -1)
+    )
+
+
+def test_helmholtz_solution_includes_polar_boundary_conditions():
+    state = ModelState(GLOBAL_CONST(NJ=24, NK=12, NL=5))
+    grid.grid(state)
+    solver = semi_implicit.SEMI_IMPLICIT(state)
+    q = np.random.default_rng(0).standard_normal((24, 12, 5))
+    dt = 1200.0
+    p = solver.solve(q, dt)
+    residual = p - dt**2 * _laplacian(state, p) @ solver.M.T - q
+    assert np.abs(residual).max() < 1e-10
+
+
+def _rms(a):
+    return np.sqrt(np.mean(a[1:-1, 1:-1] ** 2))
+
+
+def test_semi_implicit_is_stable_beyond_the_leapfrog_limit(tmp_path):
+    config = dict(NJ=24, NK=12, NL=4, TF=24.0, IEXP=1, VERBOSE=0)
+    with pytest.warns(RuntimeWarning):
+        explicit = model.run(DT=1200.0, OUT=str(tmp_path / "lf.nc"), **config)
+    assert not np.isfinite(explicit.array.ps).all()
+    reference = model.run(DT=60.0, OUT=str(tmp_path / "ref.nc"), **config).array.ps
+    for dt, tolerance in [(300.0, 0.05), (1200.0, 0.5)]:
+        implicit = model.run(
+            DT=dt, SCHEME="semi-implicit", OUT=str(tmp_path / "si.nc"), **config
+        ).array.ps
+        assert _rms(implicit - reference) < tolerance * _rms(reference)
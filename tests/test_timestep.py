@@ -0,0 +1,139 @@
+import shutil
+
+import netCDF4
+import numpy as np
+import pytest
+
+from globagrim import model, restart, timestep
+from globagrim.constants import GLOBAL_CONST
+from globagrim.variables import ModelState
+
+
+@pytest.mark.parametrize("alpha", [1.0, 0.5])
+def test_asselin_filter_displaces_current_and_future_level(alpha):
+    state = ModelState(GLOBAL_CONST(NJ=8, NK=4, NL=3, ASSELIN=0.2, WILLIAMS=alpha))
+    array = state.array
+    rng = np.random.default_rng(0)
+    levels = [
+        ("psa", "ps", "psn"),
+        ("ua", "u", "un"),
+        ("va", "v", "vn"),
+        ("ta", "t", "tn"),
+    ]
+    for names in levels:
+        for name in names:
+            getattr(array, name)[...] = rng.standard_normal(getattr(array, name).shape)
+    before = {name: getattr(array, name).copy() for names in levels for name in names}
+    timestep.asselin_filter(state)
+    for past, current, future in levels:
+        d = 0.1 * (before[past] - 2.0 * before[current] + before[future])
+        np.testing.assert_allclose(getattr(array, current), before[current] + alpha * d)
+        np.testing.assert_allclose(
+            getattr(array, future), before[future] - (1.0 - alpha) * d
+        )
+
+
+def test_adaptive_time_step_keeps_too_large_dt_stable(tmp_path):
+    config = dict(NJ=24, NK=12, NL=4, TF=24.0, IEXP=1, INT=6.0, VERBOSE=0)
+    with pytest.warns(RuntimeWarning):
+        fixed = model.run(DT=1200.0, OUT=str(tmp_path / "fixed.nc"), **config)
+    assert not np.isfinite(fixed.array.ps).all()
+    adaptive = model.run(
+        DT=1200.0, CFL=0.7, ASSELIN=0.1, OUT=str(tmp_path / "adaptive.nc"), **config
+    )
+    assert np.isfinite(adaptive.array.ps).all()
+    assert adaptive.const.DT < 1200.0
+    assert adaptive.scalar.ti == pytest.approx(24 * 3600)
+    with netCDF4.Dataset(tmp_path / "adaptive.nc") as ds:
+        hours = (ds["time"][:] - ds["time"][0]) / 3600
+    np.testing.assert_allclose(hours, [0, 6, 12, 18, 24], atol=adaptive.const.DT / 3600)
+
+
+def test_adaptive_time_step_grows_small_dt(tmp_path):
+    state = model.run(
+        NJ=24,
+        NK=12,
+        NL=4,
+        DT=15.0,
+        TF=2.0,
+        CFL=0.7,
+        CFL_INT=5,
+        OUT=str(tmp_path / "out.nc"),
+        VERBOSE=0,
+    )
+    assert state.const.DT > 15.0
+    assert timestep.courant_number(
+        state, timestep.gravity_wave_speed(state)
+    ) == pytest.approx(0.7, rel=0.3)
+
+
+def test_adaptive_time_step_checked_on_the_last_step(tmp_path):
+    # 60 steps of 60 s, the last one is a check step and ti ends a rounding
+    # error short of TF
+    state = model.run(
+        NJ=24,
+        NK=12,
+        NL=4,
+        DT=60.0,
+        TF=1.0,
+        IEXP=3,
+        SEED=3,
+        CFL=0.5,
+        CFL_INT=5,
+        OUT=str(tmp_path / "out.nc"),
+        VERBOSE=0,
+    )
+    assert state.scalar.ti == pytest.approx(3600.0)
+
+
+def test_adaptive_run_resumes_bit_identical_from_every_checkpoint(
+    tmp_path, monkeypatch
+):
+    # keep a copy of every checkpoint, some are written on steps that
+    # change DT
+    write_restart = restart.write_restart
+
+    def keep(state, step, euler=False):
+        write_restart(state, step, euler)
+        shutil.copy(state.const.restart_path, tmp_path / ("restart%d.npz" % step))
+
+    monkeypatch.setattr(restart, "write_restart", keep)
+    config = dict(
+        NJ=24,
+        NK=12,
+        NL=4,
+        DT=60.0,
+        TF=2.0,
+        IEXP=3,
+        SEED=3,
+        CFL=0.5,
+        CFL_INT=4,
+        VERBOSE=0,
+    )
+    full = model.run(
+        RINT=0.5,
+        ROUT=str(tmp_path / "restart.npz"),
+        OUT=str(tmp_path / "full.nc"),
+        **config
+    )
+    checkpoints = sorted(tmp_path.glob("restart[0-9]*.npz"))
+    assert len(checkpoints) == 4
+    euler = [bool(np.load(path)["euler"]) for path in checkpoints]
+    assert any(euler)
+    for path in checkpoints[:-1]:
+        resumed = model.run(
+            RESTART=str(path), OUT=str(tmp_path / (path.stem + ".nc")), **config
+        )
+        assert resumed.const.DT == full.const.DT
+        for name in ["ps", "u", "v", "t", "psa", "ua", "va", "ta"]:
+            np.testing.assert_array_equal(
+                getattr(resumed.array, name), getattr(full.array, name), err_msg=name
+            )
+
+
+def test_sweep_counts_the_adaptive_time_steps(tmp_path):
+    config = dict(NJ=24, NK=12, NL=4, DT=15.0, TF=1.0, IEXP=1, CFL=0.7, CFL_INT=5)
+    manifest = model.sweep([config], DIR=str(tmp_path), PROCESSES=1)
+    (record,) = manifest["runs"]
+    with netCDF4.Dataset(record["output"]) as ds:  # output every time step
+        assert record["steps"] == ds["time"].shape[0] - 1
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from globagrim import boundary_conditions, grid, trend
+from globagrim.constants import GLOBAL_CONST
+from globagrim.variables import ModelState
+
+FIELDS = ["psg", "uw", "vw", "tw", "gp", "ut", "vt", "tt", "pst"]
+
+
+def _random_state(seed, NL=6, **kwargs):
+    rng = np.random.default_rng(seed)
+    state = ModelState(GLOBAL_CONST(NJ=24, NK=12, NL=NL, **kwargs))
+    array = state.array
+    grid.grid(state)
+    array.ps[:] = rng.uniform(-1000.0, 1000.0, array.ps.shape)
+    array.phis[:] = rng.uniform(0.0, 2.0e4, array.phis.shape)
+    for name in ["u", "v"]:
+        getattr(array, name)[:] = (
+            rng.uniform(-30.0, 30.0, array.u.shape) * state.const.PS0
+        )
+    array.t[:] = rng.uniform(-20.0, 20.0, array.t.shape) * state.const.PS0
+    boundary_conditions.boundary_conditions(state)
+    return state
+
+
+def _tendencies(state):
+    trend.trend(state)
+    return {name: getattr(state.array, name).copy() for name in FIELDS}
+
+
+@pytest.mark.parametrize("NL", [3, 6, 40])
+def test_numpy_backend_matches_reference(NL):
+    # the metric coefficients of grid.grid() change the rounding only
+    reference = _tendencies(_random_state(0, NL, BACKEND="reference"))
+    vectorized = _tendencies(_random_state(0, NL, BACKEND="numpy"))
+    for name in FIELDS:
+        scale = np.abs(reference[name]).max()
+        np.testing.assert_allclose(
+            vectorized[name], reference[name], rtol=0, atol=1e-14 * scale, err_msg=name
+        )
+
+
+def test_numba_backend_is_bit_compatible_with_numpy():
+    pytest.importorskip("numba")
+    vectorized = _tendencies(_random_state(0, BACKEND="numpy"))
+    compiled = _tendencies(_random_state(0, BACKEND="numba"))
+    for name in FIELDS:
+        np.testing.assert_array_equal(compiled[name], vectorized[name], err_msg=name)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_latitude_bands_match_single_thread(backend):
+    if backend == "numba":
+        pytest.importorskip("numba")
+    serial = _tendencies(_random_state(0, BACKEND=backend))
+    banded = _tendencies(_random_state(0, BACKEND=backend, NTHREADS=5))
+    for name in FIELDS:
+        np.testing.assert_array_equal(banded[name], serial[name], err_msg=name)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_lean_mode_matches_stored_terms(backend):
+    if backend == "numba":
+        pytest.importorskip("numba")
+    full = _tendencies(_random_state(0, BACKEND=backend))
+    state = _random_state(0, BACKEND=backend, LEAN=True, NTHREADS=2)
+    assert state.array.comp is None and state.array.ut is state.array.un
+    lean = _tendencies(state)
+    for name in FIELDS:
+        np.testing.assert_array_equal(lean[name], full[name], err_msg=name)
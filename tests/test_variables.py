@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from globagrim.constants import GLOBAL_CONST
+from globagrim.variables import GLOBAL_ARRAY, ModelState
+
+
+def test_advance_time_levels_rotates_without_copy():
+    array = GLOBAL_ARRAY(GLOBAL_CONST())
+    past, now, future = array.ua, array.u, array.un
+    array.advance_time_levels()
+    assert array.ua is now
+    assert array.u is future
+    assert array.un is past
+
+
+def test_model_state_is_allocated_from_configuration():
+    low = ModelState(GLOBAL_CONST(NJ=36, NK=18, NL=5))
+    high = ModelState(GLOBAL_CONST(NJ=288, NK=144, NL=5))
+    assert low.array.u.shape == (38, 20, 5)
+    assert high.array.u.shape == (290, 146, 5)
+    assert GLOBAL_CONST().NJ == 144
+
+
+def test_float32_arrays():
+    array = GLOBAL_ARRAY(GLOBAL_CONST(NJ=36, NK=18, NL=5, DTYPE="float32"))
+    assert array.u.dtype == np.float32
+    assert array.ps.dtype == np.float32
+    assert array.dx.dtype == np.float32
+    with pytest.raises(ValueError):
+        GLOBAL_ARRAY(GLOBAL_CONST(DTYPE="int32"))
+
+
+@pytest.mark.parametrize("layout", ["planes", None, 1])
+def test_unknown_layout_is_rejected(layout):
+    with pytest.raises(ValueError, match="LAYOUT"):
+        GLOBAL_ARRAY(GLOBAL_CONST(NJ=8, NK=4, NL=3, LAYOUT=layout))